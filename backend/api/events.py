@@ -0,0 +1,26 @@
+from typing import Optional
+from uuid import UUID
+from fastapi import APIRouter
+from fastapi.responses import StreamingResponse
+from helpers.events import balance_events, iter_sse
+
+router = APIRouter()
+
+@router.get("/events/balances")
+async def stream_balance_changes(
+    user_id: Optional[UUID] = None,
+    group_id: Optional[UUID] = None
+):
+    # Server-sent events with the balance changes of every new expense;
+    # with user_id only that user's pairs, with group_id only that group's
+    # expenses
+    async def stream():
+        with balance_events.subscribe(user_id, group_id) as subscription:
+            async for frame in iter_sse(subscription):
+                yield frame
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -1,98 +1,82 @@
+import asyncio
+from datetime import datetime, timezone
+from typing import Optional
 from uuid import UUID
-from fastapi import APIRouter, HTTPException
-from schema.expense import (
-    ExpenseCreate,
-    ExpenseResponse,
-    SplitType
-)
-from database import supabase
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from schema.expense import ExpenseCreate, ExpenseResponse
+from config import get_settings
+from database import supabase, run_query
 from helpers.utils import (
     get_users,
-    get_expenses,
-    get_splits,
-    calculate_balances,
+    get_user_expenses_and_splits,
+    get_related_user_ids,
+    get_expense_page,
+    decode_cursor,
+    get_expense_overview,
+    iter_expense_summary_pages,
+    build_expense_summaries,
     calculate_user_expense_details,
+    calculate_user_totals,
     format_balances
 )
+from helpers.ledger import get_ledger_balances, get_window_balances, get_pair_balances
+from helpers.settlement import simplify_debts
+from helpers.money import from_paise
+from helpers.splits import validate_splits, expense_row, split_rows
+from helpers.imports import import_expense_stream
+from helpers.exports import iter_csv, iter_ndjson
+from helpers.conditional import ledger_validators, is_not_modified, not_modified
+from helpers.events import publish_expense
+
+settings = get_settings()
 
 router = APIRouter()
 
 
+def as_utc(value):
+    # naive datetimes are taken as UTC rather than the database's timezone
+    if value is None or value.tzinfo is not None:
+        return value
+    return value.replace(tzinfo=timezone.utc)
+
+
+def time_window(since, until, as_of):
+    # `as_of` is the cumulative view up to a moment; `since`/`until` bound a
+    # window of expenses, e.g. a monthly statement
+    since, until, as_of = as_utc(since), as_utc(until), as_utc(as_of)
+    if as_of and (since or until):
+        raise HTTPException(
+            status_code=400,
+            detail="Use either as_of or since/until, not both"
+        )
+    if since and until and since >= until:
+        raise HTTPException(status_code=400, detail="since must be before until")
+    return since, until or as_of
+
+
 @router.post("/add-expense", response_model=ExpenseResponse)
 async def create_expense(expense: ExpenseCreate):
     try:
         # splits based on split_type
-        if not expense.splits:
-            raise HTTPException(
-                status_code=400,
-                detail="At least one split is required"
-            )
-
-        if expense.split_type == SplitType.PERCENTAGE:
-            total_percentage = sum(split.percentage or 0 for split in
-                                   expense.splits)
-            if abs(total_percentage - 100) > 0.01:
-                raise HTTPException(
-                    status_code=400,
-                    detail="Percentage splits must sum to 100%"
-                )
-        elif expense.split_type == SplitType.EXACT:
-            total_amount = sum(split.amount or 0 for split in expense.splits)
-            if abs(total_amount - expense.amount) > 0.01:
-                raise HTTPException(
-                    status_code=400,
-                    detail="Exact splits must sum to total amount"
-                )
-
-        # Create an expense
-        expense_data = {
-            "name": expense.name,
-            "description": expense.description,
-            "amount": float(expense.amount),
-            "created_by": str(expense.created_by),
-            "split_type": expense.split_type
-        }
+        error = validate_splits(expense)
+        if error:
+            raise HTTPException(status_code=400, detail=error)
 
-        expense_response = supabase.table('expenses').insert(expense_data).execute()
+        # Create the expense and its splits in one transaction
+        response = await run_query(supabase.rpc('create_expense_with_splits', {
+            "p_expense": expense_row(expense),
+            "p_splits": split_rows(expense)
+        }))
 
-        if not expense_response.data:
+        if not response.data:
             raise HTTPException(
                 status_code=400,
                 detail="Failed to create expense"
             )
 
-        created_expense = expense_response.data[0]
-        expense_id = created_expense['id']
-
-        # Creating splits
-        splits_data = []
-        if expense.split_type == SplitType.EQUAL:
-            split_amount = float(expense.amount) / len(expense.splits)
-            for split in expense.splits:
-                splits_data.append({
-                    "expense_id": expense_id,
-                    "user_id": str(split.user_id),
-                    "amount": split_amount
-                })
-        else:
-            for split in expense.splits:
-                split_data = {
-                    "expense_id": expense_id,
-                    "user_id": str(split.user_id)
-                }
-                if expense.split_type == SplitType.EXACT:
-                    split_data["amount"] = float(split.amount)
-                else:  # for percentage splits
-                    split_data["percentage"] = float(split.percentage)
-                    split_data["amount"] = float(expense.amount) * float(split.percentage) / 100
-                splits_data.append(split_data)
-
-        splits_response = supabase.table('expense_splits').insert(splits_data).execute()
-
-        return {
-            **created_expense,
-            "splits": splits_response.data
-        }
+        await publish_expense(response.data)
+        return response.data
 
     except HTTPException as he:
         raise he
@@ -104,14 +88,45 @@ async def create_expense(expense: ExpenseCreate):
         )
 
 
+@router.post("/import-expenses")
+async def import_expenses(request: Request):
+    # Body is NDJSON (one ExpenseCreate per line) or CSV with a header row
+    # when sent as text/csv. Invalid rows are reported, not fatal.
+    try:
+        file_format = "csv" if "csv" in request.headers.get("content-type", "") else "ndjson"
+        return await import_expense_stream(request.stream(), file_format)
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Error importing expenses: {str(e)}"
+        )
+
+
 @router.get("/balance-sheet")
-async def get_balance_sheet():
+async def get_balance_sheet(
+    request: Request,
+    response: Response,
+    group_id: Optional[UUID] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    as_of: Optional[datetime] = None
+):
+    since, until = time_window(since, until, as_of)
     try:
-        users = get_users()
-        expenses = get_expenses().data
-        splits = get_splits().data
+        headers = await ledger_validators(group_id)
+        if is_not_modified(request, headers):
+            return not_modified(headers)
+        response.headers.update(headers)
 
-        balances = calculate_balances(expenses, splits)
+        if since or until:
+            balances = await get_window_balances(since, until, group_id)
+        else:
+            balances = await get_ledger_balances(group_id)
+        users = await get_users(
+            [debtor for debtor in balances] +
+            [creditor for creditors in balances.values() for creditor in creditors]
+        )
         formatted_balances = format_balances(balances, users)
 
         return formatted_balances
@@ -123,23 +138,82 @@ async def get_balance_sheet():
         )
 
 
+@router.get("/balance-sheet/settle")
+async def get_settlement_plan(
+    request: Request, response: Response, group_id: Optional[UUID] = None
+):
+    # Minimal list of transfers that settles every user's net balance
+    try:
+        headers = await ledger_validators(group_id)
+        if is_not_modified(request, headers):
+            return not_modified(headers)
+        response.headers.update(headers)
+
+        transfers = simplify_debts(await get_ledger_balances(group_id))
+        users = await get_users(
+            [debtor for debtor, _, _ in transfers] +
+            [creditor for _, creditor, _ in transfers]
+        )
+
+        return [
+            {
+                "from_user": {"id": debtor, "name": users[debtor]},
+                "to_user": {"id": creditor, "name": users[creditor]},
+                "amount": from_paise(amount),
+                "direction": "pays"
+            }
+            for debtor, creditor, amount in transfers
+        ]
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Error generating settlement plan: {str(e)}"
+        )
+
+
 @router.get("/e/user/{user_id}")
-async def get_user_balance_sheet(user_id: UUID):
+async def get_user_balance_sheet(
+    request: Request,
+    response: Response,
+    user_id: UUID,
+    group_id: Optional[UUID] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    as_of: Optional[datetime] = None
+):
+    since, until = time_window(since, until, as_of)
     try:
-        expenses = get_expenses().data
-        splits = get_splits().data
-        user = get_users()[str(user_id)]
+        headers = await ledger_validators(group_id)
+        if is_not_modified(request, headers):
+            return not_modified(headers)
+        response.headers.update(headers)
+
+        if as_of:
+            # Cumulative totals come from the nearest snapshot, so they are
+            # not itemised; since/until, even until alone, are itemised.
+            # time_window has normalized as_of into `until`.
+            pair_balances = await get_pair_balances(
+                until=until, group_id=group_id, user_id=user_id
+            )
+            paid, owed, balances_by_user = calculate_user_totals(pair_balances, user_id)
+        else:
+            expenses, splits = await get_user_expenses_and_splits(
+                user_id, group_id, since, until
+            )
+            paid, owed, balances_by_user = calculate_user_expense_details(
+                expenses, splits, user_id
+            )
+        # only the names shown: the user's and each counterparty's
+        users = await get_users([user_id] + list(balances_by_user))
+        user = users.get(str(user_id))
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
 
-        paid, owed, balances_by_user = calculate_user_expense_details(
-            expenses, splits, user_id
-        )
-
         detailed_balances = [
             {
-                "user": {"id": user_id, "name": user},
-                "total_amount": abs(user_data["total"]),
+                "user": {"id": other_id, "name": users.get(other_id)},
+                "total_amount": from_paise(abs(user_data["total"])),
                 "direction": "owes_you" if user_data["total"] > 0 else
                              "you_owe",
                 "expense_details": [
@@ -154,15 +228,15 @@ async def get_user_balance_sheet(user_id: UUID):
                                           reverse=True)
                 ]
             }
-            for user_id, user_data in balances_by_user.items()
-            if abs(user_data["total"]) > 0.01
+            for other_id, user_data in balances_by_user.items()
+            if user_data["total"] != 0
         ]
 
         return {
             "summary": {
-                "total_paid": paid,
-                "total_owed": owed,
-                "net_balance": paid - owed
+                "total_paid": from_paise(paid),
+                "total_owed": from_paise(owed),
+                "net_balance": from_paise(paid - owed)
             },
             "detailed_balances": detailed_balances
         }
@@ -177,58 +251,43 @@ async def get_user_balance_sheet(user_id: UUID):
 
 
 @router.get("/e/all")
-async def get_overall_expenses():
+async def get_overall_expenses(
+    request: Request,
+    response: Response,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    stream: bool = False,
+    group_id: Optional[UUID] = None
+):
+    # Pages are ordered most recent first; pass `next_cursor` back as `cursor`
+    # for the following page, or `stream=true` for NDJSON of every expense.
+    if stream:
+        # checked up front: once streaming, an error can no longer be a 400
+        if cursor:
+            try:
+                decode_cursor(cursor)
+            except (ValueError, TypeError):
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+        return StreamingResponse(
+            iter_ndjson(iter_expense_summary_pages(limit, cursor, group_id)),
+            media_type="application/x-ndjson"
+        )
+
     try:
-        users = get_users()
-        expenses_response = get_expenses()
-        splits_response = get_splits()
-
-        expense_summaries = []
-        total_amount = 0
-
-        for expense in expenses_response.data:
-            expense_splits = [
-                split for split in splits_response.data
-                if split['expense_id'] == expense['id']
-            ]
-
-            split_details = []
-            for split in expense_splits:
-                split_details.append({
-                    "user_name": users[split['user_id']],
-                    "amount": split['amount'],
-                    "percentage": split['percentage'],
-                    "type": "paid" if split['user_id'] == expense['created_by']
-                    else "owes"
-                })
-
-            # Add to total amount
-            total_amount += expense['amount']
-
-            # Create expense summary
-            expense_summaries.append({
-                "expense_id": expense['id'],
-                "name": expense['name'],
-                "description": expense['description'],
-                "amount": expense['amount'],
-                "date": expense['created_at'],
-                "split_type": expense['split_type'],
-                "paid_by": users[expense['created_by']],
-                "splits": split_details
-            })
-
-        # Sort expenses by date (most recent first)
-        expense_summaries.sort(key=lambda x: x['date'], reverse=True)
+        headers = await ledger_validators(group_id)
+        if is_not_modified(request, headers):
+            return not_modified(headers)
+        response.headers.update(headers)
+
+        overview, (expenses, splits, next_cursor) = await asyncio.gather(
+            get_expense_overview(group_id), get_expense_page(limit, cursor, group_id)
+        )
+        users = await get_users(get_related_user_ids(expenses, splits))
 
         return {
-            "overview": {
-                "total_expenses": len(expense_summaries),
-                "total_amount": total_amount,
-                "average_amount": round(total_amount /
-                                        len(expense_summaries), 2)
-                if expense_summaries else 0
-            },
-            "expenses": expense_summaries
+            "overview": overview,
+            "expenses": build_expense_summaries(expenses, splits, users),
+            "next_cursor": next_cursor
         }
 
     except Exception as e:
@@ -236,3 +295,19 @@ async def get_overall_expenses():
             status_code=400,
             detail=f"Error getting overall expenses: {str(e)}"
         )
+
+
+@router.get("/e/export")
+async def export_expenses(
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    group_id: Optional[UUID] = None
+):
+    # Streams the full ledger page by page, so memory stays flat
+    pages = iter_expense_summary_pages(settings.EXPORT_PAGE_SIZE, group_id=group_id)
+    if format == "csv":
+        return StreamingResponse(
+            iter_csv(pages),
+            media_type="text/csv",
+            headers={"Content-Disposition": "attachment; filename=expenses.csv"}
+        )
+    return StreamingResponse(iter_ndjson(pages), media_type="application/x-ndjson")
@@ -0,0 +1,44 @@
+from fastapi import APIRouter, HTTPException
+from uuid import UUID
+from schema.group import GroupCreate, GroupResponse
+from database import supabase, run_query
+from helpers.projections import columns
+
+router = APIRouter()
+
+# Group-scoped balances, expenses and exports take `group_id` as a query
+# parameter on /balance-sheet, /e/all, /e/export and the PDF download.
+
+@router.post("/add-group", response_model=GroupResponse)
+async def create_group(group: GroupCreate):
+    try:
+        response = await run_query(supabase.table('groups').insert({
+            "name": group.name,
+            "created_by": str(group.created_by)
+        }))
+
+        return response.data[0]
+    except Exception as e:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Error creating group: {str(e)}"
+        )
+
+@router.get("/g/{group_id}", response_model=GroupResponse)
+async def get_group(group_id: UUID):
+    try:
+        response = await run_query(
+            supabase.table('groups').select(columns('groups', 'detail')).eq(
+                'id', str(group_id)
+            )
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Error fetching group: {str(e)}"
+        )
+
+    if not response.data:
+        raise HTTPException(status_code=404, detail="Group not found")
+
+    return response.data[0]
@@ -1,19 +1,24 @@
+import asyncio
 import uuid
 from fastapi import APIRouter, HTTPException
-from schema.user import UserCreate, UserResponse, UserUpdate
-from typing import List
-from database import supabase
+from schema.user import UserCreate, UserResponse, UserUpdate, UserBatchGet, UserBatchResponse
+from typing import Any, Dict, List
+from database import supabase, run_query
+from helpers.utils import user_names, chunked
+from helpers.imports import import_users
+from helpers.projections import columns
 
 router = APIRouter()
 
 @router.post("/add-user", response_model=UserResponse)
 async def create_user(user: UserCreate):
     try:
-        response = supabase.table('users').insert({
+        response = await run_query(supabase.table('users').insert({
             "email": user.email,
             "name": user.name,
             "mobile": user.mobile
-        }).execute()
+        }))
+        user_names.invalidate(response.data[0]['id'])
         
         return response.data[0]
     except Exception as e:
@@ -22,10 +27,51 @@ async def create_user(user: UserCreate):
             detail=f"Error creating user: {str(e)}"
         )
 
+@router.post("/add-users")
+async def create_users(records: List[Dict[str, Any]]):
+    # Every record is validated and inserted on its own; invalid rows and
+    # duplicate emails or mobiles are reported per row (numbered from 1)
+    # instead of failing the request
+    try:
+        return await import_users(records)
+    except Exception as e:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Error creating users: {str(e)}"
+        )
+
+@router.post("/users/batch-get", response_model=UserBatchResponse)
+async def get_users_data(batch: UserBatchGet):
+    ids = list(dict.fromkeys(str(user_id) for user_id in batch.ids))
+    try:
+        responses = await asyncio.gather(*(
+            run_query(supabase.table('users').select(
+                columns('users', 'profile', 'id')
+            ).in_('id', chunk))
+            for chunk in chunked(ids)
+        ))
+    except Exception as e:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Error fetching users: {str(e)}"
+        )
+
+    users = {}
+    for response in responses:
+        for user in response.data:
+            user_names.set(user['id'], user['name'])
+            users[user.pop('id')] = user
+    return {
+        "users": users,
+        "missing": [user_id for user_id in ids if user_id not in users]
+    }
+
 @router.get("/u/{user_id}", response_model=UserResponse)
 async def get_user_data(user_id: str):
     try:
-        response = supabase.table('users').select("*").eq('id', user_id).execute()
+        response = await run_query(
+            supabase.table('users').select(columns('users', 'profile')).eq('id', user_id)
+        )
         
         if not response.data:
             raise HTTPException(status_code=404, detail="User not found")
@@ -40,7 +86,9 @@ async def get_user_data(user_id: str):
 @router.get("/users", response_model=List[UserResponse])
 async def list_users():
     try:
-        response = supabase.table('users').select("*").execute()
+        response = await run_query(
+            supabase.table('users').select(columns('users', 'profile'))
+        )
         return response.data
     except Exception as e:
         raise HTTPException(
@@ -62,15 +110,18 @@ async def update_user_data(user_id: str, user: UserUpdate):
             )
 
         # First check if user exists and then proceed with update
-        check_user = supabase.table('users').select("*").eq('id', str(uuid_obj)).execute()
+        check_user = await run_query(
+            supabase.table('users').select('id').eq('id', str(uuid_obj))
+        )
         
         if not check_user.data:
             raise HTTPException(status_code=404, detail="User not found")
 
         update_data = user.model_dump(exclude_unset=True)
-        response = supabase.table('users').update(
+        response = await run_query(supabase.table('users').update(
             update_data
-        ).eq('id', str(uuid_obj)).execute()
+        ).eq('id', str(uuid_obj)))
+        user_names.invalidate(str(uuid_obj))
         
         return response.data[0]
     except HTTPException as he:
@@ -0,0 +1,75 @@
+import argparse
+import random
+import time
+import uuid
+from helpers.model import LedgerColumns
+from helpers.utils import calculate_balances_python
+from helpers import vectorized
+
+# Compares the pure-Python and NumPy balance paths, from dict rows and from
+# LedgerColumns, and checks they agree, e.g.
+#   python -m benchmarks.balances --splits 10000 100000 1000000
+
+
+def synthetic_ledger(split_count, users, splits_per_expense, rng):
+    user_ids = [str(uuid.UUID(int=rng.getrandbits(128))) for _ in range(users)]
+    expenses = []
+    splits = []
+    while len(splits) < split_count:
+        expense_id = str(uuid.UUID(int=rng.getrandbits(128)))
+        expenses.append({"id": expense_id, "created_by": rng.choice(user_ids)})
+        for user_id in rng.sample(user_ids, min(splits_per_expense, users)):
+            splits.append({
+                "expense_id": expense_id,
+                "user_id": user_id,
+                "amount": rng.randint(1, 1000000) / 100
+            })
+    rng.shuffle(splits)
+    return expenses, splits[:split_count]
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Balance calculation benchmark")
+    parser.add_argument("--splits", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--splits-per-expense", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if not vectorized.is_available():
+        raise SystemExit("NumPy is not installed; only the pure-Python path is available")
+
+    rng = random.Random(args.seed)
+    for count in args.splits:
+        expenses, splits = synthetic_ledger(count, args.users, args.splits_per_expense, rng)
+
+        python_result, python_time = timed(calculate_balances_python, expenses, splits)
+        columns, columns_time = timed(vectorized.balance_columns, expenses, splits)
+        numpy_result, reduce_time = timed(vectorized.reduce_balance_columns, *columns)
+        assert numpy_result == python_result, "vectorized result differs"
+        assert list(numpy_result) == list(python_result), "pair order differs"
+
+        numpy_time = columns_time + reduce_time
+        print(f"{count:>9} splits, rows:          python {python_time:.3f}s, "
+              f"numpy {numpy_time:.3f}s ({python_time / numpy_time:.1f}x; "
+              f"columns {columns_time:.3f}s + reduce {reduce_time:.3f}s)")
+
+        # what the ledger check reads: columns are built while paging, so
+        # only the reduction counts
+        ledger = LedgerColumns.from_rows(expenses, splits)
+        ledger_result, ledger_time = timed(ledger.balances)
+        ledger_numpy_result, ledger_numpy_time = timed(vectorized.calculate_ledger_vectorized, ledger)
+        assert ledger_result == ledger_numpy_result == python_result, "LedgerColumns result differs"
+        assert list(ledger_numpy_result) == list(python_result), "pair order differs"
+        print(f"{count:>9} splits, LedgerColumns: python {ledger_time:.3f}s, "
+              f"numpy {ledger_numpy_time:.3f}s ({ledger_time / ledger_numpy_time:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
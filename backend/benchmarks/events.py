@@ -0,0 +1,122 @@
+import argparse
+import asyncio
+import random
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+from benchmarks.fake_supabase import FakeSupabase
+from benchmarks.load_test import percentile
+from benchmarks.suite import install, synthetic_tables
+
+# Delivery latency of balance change events to many subscribers, against
+# recomputing balances as a poll would, and a check that the pushed changes
+# add up to the ledger's own change, e.g.
+#   python -m benchmarks.events --subscribers 10 1000 --expenses 200
+
+
+def pair_totals(balances):
+    # (user a, user b) -> paise a owes b, netted, with a < b
+    totals = defaultdict(int)
+    for debtor, creditors in balances.items():
+        for creditor, paise in creditors.items():
+            if debtor < creditor:
+                totals[debtor, creditor] += paise
+            else:
+                totals[creditor, debtor] -= paise
+    return {pair: paise for pair, paise in totals.items() if paise}
+
+
+async def run(fake, tables, subscribers, expenses, rng):
+    from helpers.events import balance_events, publish_expense
+    from helpers.ledger import get_ledger_balances
+    from helpers.money import to_paise
+    from helpers.utils import get_expenses, get_splits, calculate_balances
+
+    user_ids = [user["id"] for user in tables["users"]]
+    latencies = []
+    pushed = defaultdict(lambda: defaultdict(int))
+    published = {}
+
+    async def consume(subscription, record):
+        while True:
+            event = await subscription.queue.get()
+            latencies.append(time.perf_counter() - published[event["expense_id"]])
+            if record:
+                for change in subscription.view(event)["changes"]:
+                    pushed[change["from_user"]][change["to_user"]] += to_paise(change["amount"])
+
+    before = await get_ledger_balances()
+    subscriptions = ExitStack()
+    tasks = []
+    for number in range(subscribers):
+        # the first subscriber sees everything and checks the totals; the
+        # rest follow one user each, as dashboards would
+        subscription = subscriptions.enter_context(
+            balance_events.subscribe(None if number == 0 else rng.choice(user_ids))
+        )
+        tasks.append(asyncio.create_task(consume(subscription, record=number == 0)))
+
+    for number in range(expenses):
+        members = rng.sample(user_ids, min(4, len(user_ids)))
+        amount = rng.randint(100, 1000000)
+        share, remainder = divmod(amount, len(members))
+        expense = fake.execute_rpc("create_expense_with_splits", {
+            "p_expense": {
+                "name": f"Event {number}", "description": None, "amount": str(amount / 100),
+                "created_by": members[0], "split_type": "EXACT", "group_id": None
+            },
+            "p_splits": [
+                {"user_id": member, "amount": str((share + (remainder if index == 0 else 0)) / 100)}
+                for index, member in enumerate(members)
+            ]
+        }).data
+        published[expense["id"]] = time.perf_counter()
+        await publish_expense(expense)
+        await asyncio.sleep(0)
+
+    await asyncio.sleep(0.1)
+    for task in tasks:
+        task.cancel()
+    subscriptions.close()
+
+    before, after = pair_totals(before), pair_totals(await get_ledger_balances())
+    changed = {
+        pair: after.get(pair, 0) - before.get(pair, 0) for pair in after.keys() | before.keys()
+    }
+    assert pair_totals(pushed) == {
+        pair: paise for pair, paise in changed.items() if paise
+    }, "pushed changes do not match the ledger"
+
+    started = time.perf_counter()
+    calculate_balances(await get_expenses("balance"), await get_splits("balance"))
+    recompute = time.perf_counter() - started
+    return latencies, recompute
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Balance change event benchmark")
+    parser.add_argument("--subscribers", type=int, nargs="+", default=[10, 1000])
+    parser.add_argument("--expenses", type=int, default=200,
+                        help="expenses created while subscribers listen")
+    parser.add_argument("--ledger-expenses", type=int, default=10000)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    fake = FakeSupabase()
+    install(fake)
+    for subscribers in args.subscribers:
+        tables = synthetic_tables(args.users, args.ledger_expenses, 4, 0, args.seed)
+        fake.reset(tables)
+        fake.execute_rpc("rebuild_user_balances", {})
+        latencies, recompute = asyncio.run(
+            run(fake, tables, subscribers, args.expenses, random.Random(args.seed))
+        )
+        print(f"{subscribers:>6} subscribers: {len(latencies)} deliveries, "
+              f"p50 {percentile(latencies, 50) * 1000:.3f} ms, "
+              f"p95 {percentile(latencies, 95) * 1000:.3f} ms; "
+              f"recomputing balances takes {recompute * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import argparse
+import asyncio
+import random
+import time
+import tracemalloc
+from helpers.exports import iter_csv, iter_ndjson
+
+# Streams a synthetic ledger through the CSV/NDJSON exporters and reports
+# throughput and peak traced memory, which should not grow with the number
+# of splits, e.g.
+#   python -m benchmarks.export --splits 100000 1000000
+
+
+async def synthetic_pages(split_count, page_size, splits_per_expense, seed):
+    rng = random.Random(seed)
+    produced = 0
+    expense_number = 0
+    while produced < split_count:
+        page = []
+        while len(page) < page_size and produced < split_count:
+            expense_number += 1
+            amount = rng.randint(100, 1000000) / 100
+            page.append({
+                "expense_id": f"expense-{expense_number}",
+                "name": f"Expense {expense_number}",
+                "description": None,
+                "amount": amount,
+                "date": "2024-01-01T00:00:00+00:00",
+                "split_type": "EQUAL",
+                "paid_by": f"User {rng.randrange(100)}",
+                "splits": [
+                    {
+                        "user_name": f"User {rng.randrange(100)}",
+                        "amount": round(amount / splits_per_expense, 2),
+                        "percentage": None,
+                        "type": "owes"
+                    }
+                    for _ in range(splits_per_expense)
+                ]
+            })
+            produced += splits_per_expense
+        yield page
+
+
+async def consume(stream):
+    size = 0
+    async for chunk in stream:
+        size += len(chunk)
+    return size
+
+
+def run(exporter, split_count, page_size, splits_per_expense, seed):
+    tracemalloc.start()
+    start = time.perf_counter()
+    size = asyncio.run(consume(exporter(
+        synthetic_pages(split_count, page_size, splits_per_expense, seed)
+    )))
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streaming export benchmark")
+    parser.add_argument("--splits", type=int, nargs="+", default=[100000, 1000000])
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--splits-per-expense", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for name, exporter in (("csv", iter_csv), ("ndjson", iter_ndjson)):
+        for count in args.splits:
+            size, elapsed, peak = run(
+                exporter, count, args.page_size, args.splits_per_expense, args.seed
+            )
+            print(f"{name:>6} {count:>9} splits: {size / 2**20:8.1f} MiB in {elapsed:.2f}s, "
+                  f"peak memory {peak / 2**20:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
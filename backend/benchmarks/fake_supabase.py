@@ -0,0 +1,547 @@
+import copy
+import itertools
+import threading
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from types import SimpleNamespace
+
+# In-memory stand-in for the parts of the supabase-py client this app uses:
+# table().select/insert/update with eq, neq, in_, or_, order and limit
+# filters, one level of `table!inner(columns)` embedding, and the RPCs
+# defined in supabase/seed.sql (whose set results take the same filters).
+# Equality filters use per-column hash indexes so lookups behave like the
+# indexed columns in Postgres. `latency` adds a fixed round trip, in
+# seconds, to every call; like PostgREST with `max_rows` in
+# supabase/config.toml, no response carries more than `max_rows` rows.
+
+_EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+_COMPARISONS = {
+    "eq": lambda a, b: a == b,
+    "neq": lambda a, b: a != b,
+    "lt": lambda a, b: a < b,
+    "lte": lambda a, b: a <= b,
+    "gt": lambda a, b: a > b,
+    "gte": lambda a, b: a >= b,
+}
+
+
+class Filter:
+
+    def __init__(self, column, op, value):
+        self.column = column
+        self.op = op
+        self.value = value
+
+    def __call__(self, row):
+        value = row.get(self.column)
+        if self.op == "is":
+            # only `is.null` is used
+            return value is None
+        if self.op == "in":
+            return value is not None and str(value) in self.value
+        if value is None:
+            return self.op == "neq" and self.value is not None
+        return _COMPARISONS[self.op](str(value), str(self.value))
+
+
+def _split_top_level(expression):
+    parts, depth, current, quoted = [], 0, "", False
+    for char in expression:
+        if char == '"':
+            quoted = not quoted
+        elif not quoted and char == "(":
+            depth += 1
+        elif not quoted and char == ")":
+            depth -= 1
+        if char == "," and depth == 0 and not quoted:
+            parts.append(current)
+            current = ""
+        else:
+            current += char
+    parts.append(current)
+    return parts
+
+
+def parse_logic(kind, expression):
+    # PostgREST logic trees, e.g. `created_at.lt."ts",and(created_at.eq."ts",id.lt.x)`
+    conditions = []
+    for part in _split_top_level(expression):
+        if part.startswith(("and(", "or(")):
+            nested = part[:part.index("(")]
+            conditions.append(parse_logic(nested, part[len(nested) + 1:-1]))
+        else:
+            column, op, value = part.split(".", 2)
+            if op == "not":
+                op, value = value.split(".", 1)
+                condition = Filter(column, op, value.strip('"'))
+                conditions.append(lambda row, condition=condition: not condition(row))
+            else:
+                conditions.append(Filter(column, op, value.strip('"')))
+    if kind == "or":
+        return lambda row: any(condition(row) for condition in conditions)
+    return lambda row: all(condition(row) for condition in conditions)
+
+
+def _parse_columns(columns):
+    # "*, expenses!inner(group_id)" -> (["*"], {"expenses": ["group_id"]})
+    plain, embeds = [], {}
+    for part in _split_top_level(columns.replace(" ", "")):
+        if "(" in part:
+            name = part[:part.index("(")].split("!")[0]
+            embeds[name] = part[part.index("(") + 1:-1].split(",")
+        elif part:
+            plain.append(part)
+    return plain, embeds
+
+
+def _foreign_key(table):
+    # expenses -> expense_id
+    return table[:-1] + "_id" if table.endswith("s") else table + "_id"
+
+
+class FakeQuery:
+
+    def __init__(self, client, table):
+        self.client = client
+        self.table = table
+        self.action = "select"
+        self.payload = None
+        self.columns = "*"
+        self.count = None
+        self.filters = []
+        self.embedded_filters = []
+        self.orders = []
+        self.row_limit = None
+
+    def select(self, columns="*", count=None):
+        self.action = "select"
+        self.columns = columns
+        self.count = count
+        return self
+
+    def insert(self, payload):
+        self.action = "insert"
+        self.payload = payload
+        return self
+
+    def update(self, payload):
+        self.action = "update"
+        self.payload = payload
+        return self
+
+    def _filter(self, column, op, value):
+        if "." in column:
+            table, column = column.split(".", 1)
+            self.embedded_filters.append((table, Filter(column, op, value)))
+        else:
+            self.filters.append(Filter(column, op, value))
+        return self
+
+    def eq(self, column, value):
+        return self._filter(column, "eq", value)
+
+    def neq(self, column, value):
+        return self._filter(column, "neq", value)
+
+    def gt(self, column, value):
+        return self._filter(column, "gt", value)
+
+    def gte(self, column, value):
+        return self._filter(column, "gte", value)
+
+    def lt(self, column, value):
+        return self._filter(column, "lt", value)
+
+    def lte(self, column, value):
+        return self._filter(column, "lte", value)
+
+    def in_(self, column, values):
+        return self._filter(column, "in", {str(value) for value in values})
+
+    def or_(self, expression):
+        self.filters.append(parse_logic("or", expression))
+        return self
+
+    def order(self, column, desc=False, nullsfirst=False):
+        # Postgres puts nulls last ascending and first descending
+        self.orders.append((column, desc, nullsfirst or desc))
+        return self
+
+    def limit(self, size):
+        self.row_limit = size
+        return self
+
+    def execute(self):
+        return self.client.execute(self)
+
+
+class FakeRpc(FakeQuery):
+
+    def __init__(self, client, name, params):
+        super().__init__(client, name)
+        self.params = params or {}
+
+    def execute(self):
+        return self.client.execute_rpc(self.table, self.params, self)
+
+
+class FakeSupabase:
+
+    def __init__(self, latency=0.0, max_rows=1000):
+        self.latency = latency
+        self.max_rows = max_rows
+        self.calls = 0
+        self._lock = threading.RLock()
+        self._clock = itertools.count()
+        self.reset()
+
+    def reset(self, tables=None):
+        with self._lock:
+            self.tables = defaultdict(list)
+            for name, rows in (tables or {}).items():
+                self.tables[name] = list(rows)
+            self._indexes = {}
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+    def rpc(self, name, params=None):
+        return FakeRpc(self, name, params)
+
+    def timestamp(self):
+        return (_EPOCH + timedelta(microseconds=next(self._clock))).isoformat()
+
+    # -- query execution -------------------------------------------------
+
+    def _round_trip(self):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def execute(self, query):
+        self._round_trip()
+        with self._lock:
+            if query.action == "insert":
+                return SimpleNamespace(data=self._insert(query.table, query.payload), count=None)
+            rows = self._matching_rows(query)
+            if query.action == "update":
+                for row in rows:
+                    row.update(copy.deepcopy(query.payload))
+                self._indexes.pop(query.table, None)
+                if query.table == "users" and rows and "name" in query.payload:
+                    self._bump_all_ledger_versions()
+                    self._overall_version()["names_version"] += 1
+                return SimpleNamespace(data=copy.deepcopy(rows), count=None)
+            return self._select(query, rows)
+
+    def _index(self, table, column):
+        indexes = self._indexes.setdefault(table, {})
+        if column not in indexes:
+            index = defaultdict(list)
+            for row in self.tables[table]:
+                index[str(row.get(column))].append(row)
+            indexes[column] = index
+        return indexes[column]
+
+    def _matching_rows(self, query):
+        candidates = self.tables[query.table]
+        for condition in query.filters:
+            if isinstance(condition, Filter) and condition.op in ("eq", "in"):
+                index = self._index(query.table, condition.column)
+                keys = [str(condition.value)] if condition.op == "eq" else condition.value
+                candidates = [row for key in keys for row in index.get(key, ())]
+                break
+        rows = [row for row in candidates if all(condition(row) for condition in query.filters)]
+        for table, condition in query.embedded_filters:
+            related = self._index(table, "id")
+            foreign_key = _foreign_key(table)
+            rows = [
+                row for row in rows
+                if any(condition(parent) for parent in related.get(str(row.get(foreign_key)), ()))
+            ]
+        return rows
+
+    def _select(self, query, rows):
+        for column, desc, nulls_first in reversed(query.orders):
+            # the null flag is flipped along with the values when reversed
+            rows = sorted(rows, key=lambda row: (
+                (row.get(column) is None) == (nulls_first == desc), str(row.get(column))
+            ), reverse=desc)
+        total = len(rows)
+        for limit in (query.row_limit, self.max_rows):
+            if limit is not None:
+                rows = rows[:limit]
+
+        plain, embeds = _parse_columns(query.columns)
+        result = []
+        for row in rows:
+            item = dict(row) if "*" in plain else {column: row.get(column) for column in plain}
+            for table, columns in embeds.items():
+                parents = self._index(table, "id").get(str(row.get(_foreign_key(table))), [])
+                item[table] = {column: parents[0].get(column) for column in columns} if parents else None
+            result.append(item)
+        return SimpleNamespace(data=copy.deepcopy(result), count=total if query.count else None)
+
+    def _insert(self, table, payload):
+        items = payload if isinstance(payload, list) else [payload]
+        inserted = []
+        for item in items:
+            row = {"id": str(uuid.uuid4()), "created_at": self.timestamp(), **copy.deepcopy(item)}
+            for column in ("amount", "percentage"):
+                if row.get(column) is not None:
+                    row[column] = float(row[column])
+            self.tables[table].append(row)
+            inserted.append(row)
+        self._indexes.pop(table, None)
+        return copy.deepcopy(inserted)
+
+    # -- RPCs from supabase/seed.sql ----------------------------------------
+
+    def execute_rpc(self, name, params, query=None):
+        self._round_trip()
+        with self._lock:
+            data = getattr(self, f"_rpc_{name}")(**params)
+            if not isinstance(data, list):
+                return SimpleNamespace(data=data, count=None)
+            if query is None:
+                query = FakeRpc(self, name, params)
+            rows = [row for row in data if all(condition(row) for condition in query.filters)]
+            return self._select(query, rows)
+
+    def _rpc_apply_expense_balances(self, p_expense_id):
+        expense = self._index("expenses", "id")[str(p_expense_id)][0]
+        owed = defaultdict(Decimal)
+        for split in self._index("expense_splits", "expense_id").get(str(p_expense_id), ()):
+            if split["user_id"] != expense["created_by"] and split.get("amount") is not None:
+                owed[split["user_id"]] += Decimal(str(split["amount"]))
+
+        balances = {
+            (row.get("group_id"), row["debtor_id"], row["creditor_id"]): row
+            for row in self.tables["user_balances"]
+        }
+        for debtor_id, amount in owed.items():
+            key = (expense.get("group_id"), debtor_id, expense["created_by"])
+            if key in balances:
+                balances[key]["amount"] = float(Decimal(str(balances[key]["amount"])) + amount)
+            else:
+                self._insert("user_balances", {
+                    "group_id": key[0], "debtor_id": debtor_id,
+                    "creditor_id": key[2], "amount": float(amount)
+                })
+
+    def _rpc_rebuild_user_balances(self):
+        totals = defaultdict(Decimal)
+        expenses = self._index("expenses", "id")
+        for split in self.tables["expense_splits"]:
+            expense = expenses[str(split["expense_id"])][0]
+            if split["user_id"] != expense["created_by"] and split.get("amount") is not None:
+                key = (expense.get("group_id"), split["user_id"], expense["created_by"])
+                totals[key] += Decimal(str(split["amount"]))
+        self.tables["user_balances"] = [
+            {"group_id": group_id, "debtor_id": debtor_id, "creditor_id": creditor_id,
+             "amount": float(amount), "updated_at": self.timestamp()}
+            for (group_id, debtor_id, creditor_id), amount in totals.items()
+        ]
+        self._indexes.pop("user_balances", None)
+        self._bump_all_ledger_versions()
+
+    def _rpc_bump_ledger_version(self, p_group_id, overall=True):
+        versions = {row["group_id"]: row for row in self.tables["ledger_versions"]}
+        scopes = [None, p_group_id] if overall else [p_group_id]
+        for scope in dict.fromkeys(scopes):
+            if scope in versions:
+                versions[scope]["version"] += 1
+                versions[scope]["updated_at"] = self.timestamp()
+            else:
+                self._insert("ledger_versions", {
+                    "group_id": scope, "version": 1, "updated_at": self.timestamp(),
+                    "names_version": 0
+                })
+
+    def _bump_all_ledger_versions(self):
+        for group in [None] + [group["id"] for group in self.tables["groups"]]:
+            self._rpc_bump_ledger_version(group, overall=False)
+
+    def _overall_version(self):
+        for row in self.tables["ledger_versions"]:
+            if row["group_id"] is None:
+                return row
+
+    def _rpc_ledger_version(self, p_group_id=None):
+        overall = self._overall_version()
+        names_version = overall["names_version"] if overall else 0
+        for row in self.tables["ledger_versions"]:
+            if row["group_id"] == p_group_id:
+                return [{"version": row["version"], "updated_at": row["updated_at"],
+                         "names_version": names_version}]
+        return [{"version": 0, "updated_at": None, "names_version": names_version}]
+
+    def _rpc_expense_overview(self, p_group_id=None):
+        expenses = self.tables["expenses"]
+        if p_group_id is not None:
+            expenses = self._index("expenses", "group_id").get(str(p_group_id), [])
+        total = sum(Decimal(str(expense["amount"])) for expense in expenses)
+        average = (total / len(expenses)).quantize(Decimal("0.01")) if expenses else 0
+        return [{
+            "total_expenses": len(expenses),
+            "total_amount": float(total),
+            "average_amount": float(average)
+        }]
+
+    def _expense_deltas(self, since=None, until=None, group_id=None):
+        # (group_id, debtor_id, creditor_id, amount) per split in the window
+        splits = self._index("expense_splits", "expense_id")
+        for expense in self.tables["expenses"]:
+            if since and expense["created_at"] < since:
+                continue
+            if until and expense["created_at"] >= until:
+                continue
+            if group_id and str(expense.get("group_id")) != str(group_id):
+                continue
+            for split in splits.get(str(expense["id"]), ()):
+                if split.get("amount") is not None:
+                    yield (expense.get("group_id"), split["user_id"], expense["created_by"],
+                           Decimal(str(split["amount"])))
+
+    def _rpc_snapshot_balances(self, p_period_end):
+        previous = max(
+            (row["period_end"] for row in self.tables["balance_snapshots"]
+             if row["period_end"] < p_period_end),
+            default=None
+        )
+        totals = defaultdict(Decimal)
+        for row in self.tables["balance_snapshots"]:
+            if row["period_end"] == previous:
+                totals[(row["group_id"], row["debtor_id"], row["creditor_id"])] += Decimal(str(row["amount"]))
+        for group_id, debtor_id, creditor_id, amount in self._expense_deltas(previous, p_period_end):
+            totals[(group_id, debtor_id, creditor_id)] += amount
+        self.tables["balance_snapshots"] = [
+            row for row in self.tables["balance_snapshots"] if row["period_end"] != p_period_end
+        ] + [
+            {"period_end": p_period_end, "group_id": group_id, "debtor_id": debtor_id,
+             "creditor_id": creditor_id, "amount": float(amount)}
+            for (group_id, debtor_id, creditor_id), amount in totals.items()
+        ]
+        self._indexes.pop("balance_snapshots", None)
+
+    def _rpc_snapshot_due_balances(self):
+        def next_month(moment):
+            return moment.replace(year=moment.year + moment.month // 12,
+                                  month=moment.month % 12 + 1)
+
+        latest = max((row["period_end"] for row in self.tables["balance_snapshots"]), default=None)
+        if latest:
+            next_end = next_month(datetime.fromisoformat(latest))
+        elif self.tables["expenses"]:
+            first = datetime.fromisoformat(min(row["created_at"] for row in self.tables["expenses"]))
+            next_end = next_month(first.replace(day=1, hour=0, minute=0, second=0, microsecond=0))
+        else:
+            return 0
+
+        created = 0
+        while next_end <= datetime.now(timezone.utc):
+            self._rpc_snapshot_balances(next_end.isoformat())
+            created += 1
+            next_end = next_month(next_end)
+        return created
+
+    def _rpc_pair_balances(self, p_since=None, p_until=None, p_group_id=None, p_user_id=None):
+        base = None
+        if p_since is None:
+            base = max(
+                (row["period_end"] for row in self.tables["balance_snapshots"]
+                 if p_until is None or row["period_end"] <= p_until),
+                default=None
+            )
+        totals = defaultdict(Decimal)
+        for row in self.tables["balance_snapshots"]:
+            if row["period_end"] == base and (
+                p_group_id is None or str(row["group_id"]) == str(p_group_id)
+            ):
+                totals[(row["debtor_id"], row["creditor_id"])] += Decimal(str(row["amount"]))
+        for _, debtor_id, creditor_id, amount in self._expense_deltas(
+            p_since or base, p_until, p_group_id
+        ):
+            totals[(debtor_id, creditor_id)] += amount
+        return [
+            {"debtor_id": debtor_id, "creditor_id": creditor_id, "amount": float(amount)}
+            for (debtor_id, creditor_id), amount in totals.items()
+            if p_user_id is None or str(p_user_id) in (debtor_id, creditor_id)
+        ]
+
+    def _rpc_create_expense_with_splits(self, p_expense, p_splits):
+        if not p_splits:
+            raise ValueError("At least one split is required")
+        split_total = sum(Decimal(str(split.get("amount") or 0)) for split in p_splits)
+        if split_total != Decimal(str(p_expense["amount"])):
+            raise ValueError(
+                f"Splits add up to {split_total} but the expense amount is {p_expense['amount']}"
+            )
+        user_ids = {str(p_expense["created_by"])} | {str(split["user_id"]) for split in p_splits}
+        missing = user_ids - set(self._index("users", "id"))
+        if missing:
+            raise ValueError(f"Unknown users: {', '.join(sorted(missing))}")
+
+        expense = self._insert("expenses", {
+            "name": p_expense["name"],
+            "description": p_expense.get("description"),
+            "amount": p_expense["amount"],
+            "created_by": p_expense["created_by"],
+            "split_type": p_expense["split_type"],
+            "group_id": p_expense.get("group_id")
+        })[0]
+        splits = self._insert("expense_splits", [
+            {
+                "expense_id": expense["id"],
+                "user_id": split["user_id"],
+                "amount": split.get("amount"),
+                "percentage": split.get("percentage")
+            }
+            for split in p_splits
+        ])
+        self._rpc_apply_expense_balances(expense["id"])
+        self._rpc_bump_ledger_version(expense.get("group_id"))
+        return {**expense, "splits": splits}
+
+    def _rpc_import_expenses(self, p_rows):
+        results = []
+        for item in p_rows:
+            try:
+                expense = self._rpc_create_expense_with_splits(item["expense"], item["splits"])
+                results.append({
+                    "row_index": item["row"], "created_expense_id": expense["id"],
+                    "error_message": None
+                })
+            except Exception as e:
+                results.append({
+                    "row_index": item["row"], "created_expense_id": None,
+                    "error_message": str(e)
+                })
+        return results
+
+    def _rpc_import_users(self, p_rows):
+        results = []
+        for item in p_rows:
+            user = item["user"]
+            conflict = next((
+                column for column in ("email", "mobile")
+                if user[column] in self._index("users", column)
+            ), None)
+            if conflict:
+                results.append({
+                    "row_index": item["row"], "created_user_id": None,
+                    "error_message": f"{conflict} already exists"
+                })
+                continue
+            created = self._insert("users", {
+                "email": user["email"], "name": user["name"], "mobile": user["mobile"]
+            })[0]
+            results.append({
+                "row_index": item["row"], "created_user_id": created["id"],
+                "error_message": None
+            })
+        return results
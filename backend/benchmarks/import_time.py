@@ -0,0 +1,70 @@
+import argparse
+import os
+import subprocess
+import sys
+
+# Measures how long `import main` takes with `python -X importtime` and fails
+# when it exceeds the budget or pulls in a module that should load lazily, e.g.
+#   python -m benchmarks.import_time --budget-ms 1000
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# loaded on first use, never while the app starts
+LAZY_MODULES = ["supabase", "reportlab", "numpy"]
+
+
+def import_times(module):
+    # name -> (self us, cumulative us) for one fresh interpreter
+    env = {
+        "SUPABASE_URL": "http://localhost:54321",
+        "SUPABASE_KEY": "import-time",
+        **os.environ
+    }
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise SystemExit(f"import {module} failed:\n{result.stderr}")
+
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description="App import time budget")
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--budget-ms", type=float, default=1000.0)
+    parser.add_argument("--runs", type=int, default=5,
+                        help="fresh interpreters to try; the fastest counts")
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    runs = [import_times(args.module) for _ in range(args.runs)]
+    fastest = min(runs, key=lambda times: times[args.module][1])
+    total_ms = fastest[args.module][1] / 1000
+
+    print(f"import {args.module}: {total_ms:.1f} ms (budget {args.budget_ms:.0f} ms)")
+    print("slowest modules by self time:")
+    for name, (self_us, cumulative_us) in sorted(
+        fastest.items(), key=lambda item: item[1][0], reverse=True
+    )[:args.top]:
+        print(f"  {name:<48} {self_us / 1000:>8.1f} ms  (cumulative {cumulative_us / 1000:.1f} ms)")
+
+    eager = [name for name in LAZY_MODULES if name in fastest]
+    failures = []
+    if eager:
+        failures.append(f"imported at startup: {', '.join(eager)}")
+    if total_ms > args.budget_ms:
+        failures.append(f"{total_ms:.1f} ms is over the {args.budget_ms:.0f} ms budget")
+    if failures:
+        raise SystemExit("FAILED: " + "; ".join(failures))
+
+
+if __name__ == "__main__":
+    main()
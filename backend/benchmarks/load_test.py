@@ -0,0 +1,75 @@
+import argparse
+import statistics
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+# Fires concurrent GET requests at a running server and reports throughput
+# and latency percentiles. Run it against the server before and after a
+# change to compare, e.g.
+#   python -m benchmarks.load_test /balance-sheet /e/all --concurrency 32
+
+
+def fetch(url, timeout):
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            response.read()
+            ok = response.status < 400
+    except Exception:
+        ok = False
+    return time.perf_counter() - start, ok
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def run(base_url, paths, concurrency, requests, timeout):
+    urls = [base_url.rstrip("/") + path for path in paths]
+    targets = [urls[i % len(urls)] for i in range(requests)]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda url: fetch(url, timeout), targets))
+    elapsed = time.perf_counter() - start
+
+    latencies = [latency for latency, ok in results if ok]
+    failures = sum(1 for _, ok in results if not ok)
+    return {
+        "requests": requests,
+        "failures": failures,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(requests / elapsed, 1) if elapsed else 0.0,
+        "latency_ms": {
+            "mean": round(statistics.fmean(latencies) * 1000, 1) if latencies else 0.0,
+            "p50": round(percentile(latencies, 50) * 1000, 1),
+            "p95": round(percentile(latencies, 95) * 1000, 1),
+            "p99": round(percentile(latencies, 99) * 1000, 1),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent GET load test")
+    parser.add_argument("paths", nargs="+", help="paths to request, round robin")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    args = parser.parse_args()
+
+    result = run(args.base_url, args.paths, args.concurrency, args.requests, args.timeout)
+    print(f"{result['requests']} requests, {result['failures']} failed "
+          f"in {result['elapsed_s']}s -> {result['throughput_rps']} req/s")
+    latency = result["latency_ms"]
+    print(f"latency ms: mean {latency['mean']}  p50 {latency['p50']}  "
+          f"p95 {latency['p95']}  p99 {latency['p99']}")
+
+
+if __name__ == "__main__":
+    main()
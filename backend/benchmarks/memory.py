@@ -0,0 +1,132 @@
+import argparse
+import gc
+import random
+import time
+import tracemalloc
+import uuid
+from helpers.model import LedgerColumns
+from helpers.utils import calculate_balances, calculate_ledger_balances
+
+# Compares the memory held by the ledger as lists of PostgREST row dicts with
+# the same ledger as LedgerColumns loaded page by page, and checks both give
+# the same balances, e.g.
+#   python -m benchmarks.memory --splits 1000000
+
+
+def synthetic_pages(split_count, users, splits_per_expense, page_size, seed):
+    # (expense pages, split pages) shaped like `select('*')` rows. Every id is
+    # a fresh string, as it is when decoded from a JSON response.
+    rng = random.Random(seed)
+    user_ids = [uuid.UUID(int=rng.getrandbits(128)) for _ in range(users)]
+    expense_ids = [
+        uuid.UUID(int=rng.getrandbits(128))
+        for _ in range(-(-split_count // splits_per_expense))
+    ]
+    payers = [rng.choice(user_ids) for _ in expense_ids]
+
+    def expense_pages():
+        for start in range(0, len(expense_ids), page_size):
+            yield [
+                {
+                    "id": str(expense_ids[index]),
+                    "created_at": "2024-01-01T00:00:00+00:00",
+                    "name": f"Expense {index}",
+                    "description": None,
+                    "amount": 1000.0,
+                    "created_by": str(payers[index]),
+                    "split_type": "EQUAL",
+                    "group_id": None
+                }
+                for index in range(start, min(start + page_size, len(expense_ids)))
+            ]
+
+    def split_pages():
+        split_rng = random.Random(seed)
+        for start in range(0, split_count, page_size):
+            yield [
+                {
+                    "id": str(uuid.UUID(int=split_rng.getrandbits(128))),
+                    "created_at": "2024-01-01T00:00:00+00:00",
+                    "expense_id": str(expense_ids[index // splits_per_expense]),
+                    "user_id": str(split_rng.choice(user_ids)),
+                    "amount": split_rng.randint(1, 1000000) / 100,
+                    "percentage": None
+                }
+                for index in range(start, min(start + page_size, split_count))
+            ]
+
+    return expense_pages, split_pages
+
+
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - started
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, retained, peak, elapsed
+
+
+def load_rows(expense_pages, split_pages):
+    expenses = [expense for page in expense_pages() for expense in page]
+    splits = [split for page in split_pages() for split in page]
+    return expenses, splits
+
+
+def load_columns(expense_pages, split_pages):
+    columns = LedgerColumns()
+    for page in expense_pages():
+        columns.add_expenses(page)
+    for page in split_pages():
+        columns.add_splits(page)
+    return columns
+
+
+def mib(size):
+    return size / (1024 * 1024)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ledger memory benchmark")
+    parser.add_argument("--splits", type=int, nargs="+", default=[1000000])
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--splits-per-expense", type=int, default=4)
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for count in args.splits:
+        pages = synthetic_pages(
+            count, args.users, args.splits_per_expense, args.page_size, args.seed
+        )
+
+        (expenses, splits), rows_retained, rows_peak, rows_load = measure(
+            lambda: load_rows(*pages)
+        )
+        started = time.perf_counter()
+        expected = calculate_balances(expenses, splits)
+        rows_calculate = time.perf_counter() - started
+        del expenses, splits
+
+        columns, columns_retained, columns_peak, columns_load = measure(
+            lambda: load_columns(*pages)
+        )
+        started = time.perf_counter()
+        actual = calculate_ledger_balances(columns)
+        columns_calculate = time.perf_counter() - started
+        assert actual == expected, "LedgerColumns balances differ"
+
+        print(f"{count:>9} splits:")
+        print(f"  row dicts      {mib(rows_retained):>8.1f} MiB held "
+              f"({rows_retained / count:.0f} B/split), peak {mib(rows_peak):.1f} MiB, "
+              f"load {rows_load:.2f}s, balances {rows_calculate:.2f}s")
+        print(f"  LedgerColumns  {mib(columns_retained):>8.1f} MiB held "
+              f"({columns_retained / count:.0f} B/split), peak {mib(columns_peak):.1f} MiB, "
+              f"load {columns_load:.2f}s, balances {columns_calculate:.2f}s")
+        print(f"  {rows_retained / columns_retained:.1f}x less memory held")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import argparse
+import random
+import time
+from collections import defaultdict
+from decimal import Decimal
+from helpers.money import to_paise
+
+# Compares pairwise balance aggregation over float, Decimal and integer paise
+# amounts on a synthetic ledger, e.g.
+#   python -m benchmarks.money --splits 100000 1000000
+
+
+def synthetic_splits(count, users, rng):
+    return [
+        (rng.randrange(users), rng.randrange(users), rng.randint(1, 1000000) / 100)
+        for _ in range(count)
+    ]
+
+
+def aggregate_float(rows):
+    balances = defaultdict(float)
+    for debtor, creditor, amount in rows:
+        balances[debtor, creditor] += amount
+    return balances
+
+
+def aggregate_decimal(rows):
+    balances = defaultdict(Decimal)
+    for debtor, creditor, amount in rows:
+        balances[debtor, creditor] += Decimal(str(amount))
+    return balances
+
+
+def aggregate_paise(rows):
+    balances = defaultdict(int)
+    for debtor, creditor, amount in rows:
+        balances[debtor, creditor] += to_paise(amount)
+    return balances
+
+
+def aggregate_preconverted_paise(rows):
+    balances = defaultdict(int)
+    for debtor, creditor, paise in rows:
+        balances[debtor, creditor] += paise
+    return balances
+
+
+def timed(function, rows):
+    start = time.perf_counter()
+    result = function(rows)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Money aggregation benchmark")
+    parser.add_argument("--splits", type=int, nargs="+", default=[100000, 1000000])
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    for count in args.splits:
+        rows = synthetic_splits(count, args.users, rng)
+        paise_rows = [(debtor, creditor, to_paise(amount)) for debtor, creditor, amount in rows]
+
+        floats, float_time = timed(aggregate_float, rows)
+        decimals, decimal_time = timed(aggregate_decimal, rows)
+        paise, paise_time = timed(aggregate_paise, rows)
+        _, preconverted_time = timed(aggregate_preconverted_paise, paise_rows)
+
+        drifted = sum(
+            1 for key, amount in decimals.items()
+            if Decimal(str(floats[key])) != amount
+        )
+        assert all(paise[key] == int(amount * 100) for key, amount in decimals.items())
+
+        print(f"{count:>9} splits: float {float_time:.3f}s "
+              f"({drifted} of {len(decimals)} pairs drifted), "
+              f"Decimal {decimal_time:.3f}s, paise {paise_time:.3f}s, "
+              f"paise (pre-converted) {preconverted_time:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import argparse
+import random
+import time
+from helpers.pdf import render_balance_sheet
+
+# Times balance sheet PDF rendering against the number of expense rows, e.g.
+#   python -m benchmarks.pdf --expenses 10 100 1000 5000
+
+
+def synthetic_rows(count, rng):
+    user_expenses = []
+    other_expenses = []
+    for i in range(count):
+        amount = rng.randint(100, 1000000) / 100
+        if i % 2:
+            user_expenses.append([
+                "2024-01-01", f"Expense {i}", f"Rs. {amount:.2f}", "EQUAL",
+                ", ".join(f"User {rng.randrange(50)}" for _ in range(3))
+            ])
+        else:
+            other_expenses.append([
+                f"User {rng.randrange(50)}", f"Expense {i}", f"Rs. {amount:.2f}",
+                "EXACT", f"Rs. {amount / 3:.2f}"
+            ])
+    return user_expenses, other_expenses
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PDF rendering benchmark")
+    parser.add_argument("--expenses", type=int, nargs="+", default=[10, 100, 1000, 5000])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    for count in args.expenses:
+        user_expenses, other_expenses = synthetic_rows(count, rng)
+        start = time.perf_counter()
+        pdf = render_balance_sheet(
+            "Benchmark User", "January 01, 2024", 123456, 65432,
+            user_expenses, other_expenses
+        )
+        elapsed = time.perf_counter() - start
+        print(f"{count:>7} expenses: {elapsed * 1000:8.1f} ms, {len(pdf) / 1024:8.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+import argparse
+import json
+import time
+from benchmarks.fake_supabase import FakeSupabase
+from benchmarks.suite import synthetic_tables
+from helpers.projections import PROJECTIONS
+
+# Payload size and JSON decode time of every table's projections against
+# select('*'), for the synthetic tables of benchmarks.suite, e.g.
+#   python -m benchmarks.projections --expenses 10000
+
+
+def payload(fake, table, columns):
+    # the response body PostgREST would send for the whole table
+    rows = fake.table(table).select(columns).execute().data
+    return json.dumps(rows, separators=(",", ":")).encode()
+
+
+def decode_time(body, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        json.loads(body)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Column projection payload benchmark")
+    parser.add_argument("--expenses", type=int, default=10000)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--splits-per-expense", type=int, default=4)
+    parser.add_argument("--groups", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="decodes per payload; the fastest counts")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    # whole tables in one response, without the max_rows cap
+    fake = FakeSupabase(max_rows=None)
+    fake.reset(synthetic_tables(
+        args.users, args.expenses, args.splits_per_expense, args.groups, args.seed
+    ))
+    fake.execute_rpc("rebuild_user_balances", {})
+
+    print(f"{'table':<16} {'projection':<10} {'bytes':>12} {'decode ms':>10}  vs select('*')")
+    for table, projections in PROJECTIONS.items():
+        full = payload(fake, table, "*")
+        full_decode = decode_time(full, args.repeat)
+        print(f"{table:<16} {'*':<10} {len(full):>12} {full_decode * 1000:>10.2f}")
+        for projection, columns in projections.items():
+            body = payload(fake, table, columns)
+            decode = decode_time(body, args.repeat)
+            print(f"{'':<16} {projection:<10} {len(body):>12} {decode * 1000:>10.2f}  "
+                  f"{len(body) / len(full):.0%} bytes, {decode / full_decode:.0%} decode")
+
+
+if __name__ == "__main__":
+    main()
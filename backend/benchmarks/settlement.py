@@ -0,0 +1,43 @@
+import argparse
+import random
+import time
+from collections import defaultdict
+from helpers.settlement import simplify_debts
+
+# Times simplify_debts on random ledgers, e.g.
+#   python -m benchmarks.settlement --users 100 1000 10000
+# tests/test_settlement.py checks the plans themselves.
+
+
+def random_ledger(users, pairs_per_user, rng):
+    balances = defaultdict(lambda: defaultdict(int))
+    for debtor in range(users):
+        for _ in range(pairs_per_user):
+            creditor = rng.randrange(users)
+            if creditor != debtor:
+                balances[f"u{debtor}"][f"u{creditor}"] += rng.randint(1, 100000)
+    return balances
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Settlement plan benchmark")
+    parser.add_argument("--users", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--pairs-per-user", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    for users in args.users:
+        balances = random_ledger(users, args.pairs_per_user, rng)
+        pairs = sum(len(creditors) for creditors in balances.values())
+
+        start = time.perf_counter()
+        transfers = simplify_debts(balances)
+        elapsed = time.perf_counter() - start
+
+        print(f"{users:>8} users {pairs:>9} pairs -> {len(transfers):>8} transfers "
+              f"in {elapsed * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
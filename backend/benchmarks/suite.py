@@ -0,0 +1,323 @@
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from benchmarks.fake_supabase import FakeSupabase
+from benchmarks.load_test import percentile
+
+# Times every endpoint and helpers/utils.py function against an in-memory
+# Supabase stand-in seeded with synthetic data, so runs are reproducible
+# without a live project. Save a run and compare a later one against it, e.g.
+#   python -m benchmarks.suite --expenses 1000 10000 --output before.json
+#   python -m benchmarks.suite --expenses 1000 10000 --compare before.json
+
+SPLIT_TYPES = ("EQUAL", "EXACT", "PERCENTAGE")
+# a month-long window inside the synthetic history, for the historical queries
+SINCE = "2025-05-15T00:00:00Z"
+AS_OF = "2025-06-15T00:00:00Z"
+
+
+def install(fake):
+    os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+    os.environ.setdefault("SUPABASE_KEY", "benchmark")
+    import database
+    database.set_client(fake)
+    from main import app
+    return app
+
+
+def synthetic_tables(users, expenses, splits_per_expense, groups, seed, months=24):
+    from helpers.money import split_equally, from_paise
+
+    rng = random.Random(seed)
+    started = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    # expenses are spread evenly over `months`, so monthly snapshots apply
+    step = max(1, months * 30 * 24 * 3600 // max(expenses, 1))
+    user_rows = [
+        {
+            "id": str(uuid.UUID(int=rng.getrandbits(128))),
+            "created_at": started.isoformat(),
+            "email": f"user{number}@example.com",
+            "name": f"User {number}",
+            "mobile": f"91{number:010d}"
+        }
+        for number in range(users)
+    ]
+    user_ids = [user["id"] for user in user_rows]
+    group_rows = [
+        {
+            "id": str(uuid.UUID(int=rng.getrandbits(128))),
+            "created_at": started.isoformat(),
+            "name": f"Group {number}",
+            "created_by": rng.choice(user_ids)
+        }
+        for number in range(groups)
+    ]
+
+    expense_rows = []
+    split_rows = []
+    for number in range(expenses):
+        expense_id = str(uuid.UUID(int=rng.getrandbits(128)))
+        created_at = (started + timedelta(seconds=number * step)).isoformat()
+        amount = rng.randint(100, 10000000)
+        members = rng.sample(user_ids, min(splits_per_expense, users))
+        expense_rows.append({
+            "id": expense_id,
+            "created_at": created_at,
+            "name": f"Expense {number}",
+            "description": None,
+            "amount": from_paise(amount),
+            "created_by": members[0],
+            "split_type": rng.choice(SPLIT_TYPES),
+            "group_id": rng.choice(group_rows)["id"] if group_rows and rng.random() < 0.5 else None
+        })
+        for user_id, share in zip(members, split_equally(amount, len(members))):
+            split_rows.append({
+                "id": str(uuid.UUID(int=rng.getrandbits(128))),
+                "created_at": created_at,
+                "expense_id": expense_id,
+                "user_id": user_id,
+                "amount": from_paise(share),
+                "percentage": None
+            })
+
+    return {
+        "users": user_rows,
+        "groups": group_rows,
+        "expenses": expense_rows,
+        "expense_splits": split_rows,
+        "user_balances": []
+    }
+
+
+def summarize(durations, calls):
+    return {
+        "iterations": len(durations),
+        "mean_ms": round(statistics.fmean(durations) * 1000, 3),
+        "p50_ms": round(percentile(durations, 50) * 1000, 3),
+        "p95_ms": round(percentile(durations, 95) * 1000, 3),
+        "min_ms": round(min(durations) * 1000, 3),
+        "db_calls": round(calls / len(durations), 1)
+    }
+
+
+class Runner:
+
+    def __init__(self, fake, iterations, warm):
+        from helpers.utils import user_names
+        from helpers.pdf import pdf_cache
+
+        self.fake = fake
+        self.iterations = iterations
+        self.warm = warm
+        self.caches = (user_names, pdf_cache)
+        self.results = {}
+
+    def _reset_caches(self):
+        if not self.warm:
+            for cache in self.caches:
+                cache.invalidate()
+
+    def measure(self, name, function, *args, **kwargs):
+        function(*args, **kwargs)
+        durations = []
+        calls = 0
+        for _ in range(self.iterations):
+            self._reset_caches()
+            calls_before = self.fake.calls
+            started = time.perf_counter()
+            function(*args, **kwargs)
+            durations.append(time.perf_counter() - started)
+            calls += self.fake.calls - calls_before
+        self.results[name] = summarize(durations, calls)
+
+    async def measure_async(self, name, function, *args, **kwargs):
+        await function(*args, **kwargs)
+        durations = []
+        calls = 0
+        for _ in range(self.iterations):
+            self._reset_caches()
+            calls_before = self.fake.calls
+            started = time.perf_counter()
+            await function(*args, **kwargs)
+            durations.append(time.perf_counter() - started)
+            calls += self.fake.calls - calls_before
+        self.results[name] = summarize(durations, calls)
+
+
+def request(client, method, path, **kwargs):
+    response = client.request(method, path, **kwargs)
+    if response.status_code >= 400:
+        raise RuntimeError(f"{method} {path} returned {response.status_code}: {response.text}")
+    return response
+
+
+def run_endpoints(runner, client, tables, rng):
+    user = rng.choice(tables["users"])["id"]
+    members = [user["id"] for user in rng.sample(tables["users"], min(3, len(tables["users"])))]
+
+    cases = [
+        ("GET /balance-sheet", "/balance-sheet"),
+        ("GET /balance-sheet/settle", "/balance-sheet/settle"),
+        ("GET /e/user/{user_id}", f"/e/user/{user}"),
+        ("GET /balance-sheet?as_of", f"/balance-sheet?as_of={AS_OF}"),
+        ("GET /e/user/{user_id}?as_of", f"/e/user/{user}?as_of={AS_OF}"),
+        ("GET /e/user/{user_id}?since&until", f"/e/user/{user}?since={SINCE}&until={AS_OF}"),
+        ("GET /e/all", "/e/all"),
+        ("GET /e/all?limit=1000", "/e/all?limit=1000"),
+        ("GET /e/export", "/e/export"),
+        ("GET /balance-sheet/download/u/{user_id}", f"/balance-sheet/download/u/{user}"),
+    ]
+    for name, path in cases:
+        runner.measure(name, request, client, "GET", path)
+
+    runner.measure("POST /users/batch-get", request, client, "POST", "/users/batch-get", json={
+        "ids": [user["id"] for user in tables["users"][:100]]
+    })
+
+    runner.measure("POST /add-expense", request, client, "POST", "/add-expense", json={
+        "name": "Benchmark expense",
+        "amount": 300,
+        "created_by": members[0],
+        "split_type": "EQUAL",
+        "splits": [{"user_id": member} for member in members]
+    })
+
+
+async def run_helpers(runner, tables, rng):
+    from helpers import utils
+
+    user = rng.choice(tables["users"])["id"]
+    user_ids = [row["id"] for row in rng.sample(tables["users"], min(200, len(tables["users"])))]
+
+    await runner.measure_async("utils.get_users", utils.get_users, user_ids)
+    await runner.measure_async("utils.get_expenses", utils.get_expenses)
+    await runner.measure_async("utils.get_splits", utils.get_splits)
+    await runner.measure_async("utils.get_expenses(balance)", utils.get_expenses, "balance")
+    await runner.measure_async("utils.get_splits(balance)", utils.get_splits, "balance")
+    await runner.measure_async(
+        "utils.get_user_expenses_and_splits", utils.get_user_expenses_and_splits, user
+    )
+    await runner.measure_async("utils.get_expense_page", utils.get_expense_page, 100)
+    await runner.measure_async("utils.get_expense_overview", utils.get_expense_overview)
+
+    expenses = await utils.get_expenses("balance")
+    splits = await utils.get_splits("balance")
+    page_expenses, page_splits, _ = await utils.get_expense_page(100)
+    users = await utils.get_users(utils.get_related_user_ids(page_expenses, page_splits))
+    balances = utils.calculate_balances(expenses, splits)
+    all_users = {row["id"]: row["name"] for row in tables["users"]}
+    user_expenses, user_splits = await utils.get_user_expenses_and_splits(user)
+
+    runner.measure("utils.get_related_user_ids", utils.get_related_user_ids, expenses, splits)
+    runner.measure("utils.group_splits_by_expense", utils.group_splits_by_expense, splits)
+    runner.measure(
+        "utils.build_expense_summaries", utils.build_expense_summaries,
+        page_expenses, page_splits, users
+    )
+    runner.measure("utils.calculate_balances", utils.calculate_balances, expenses, splits)
+    runner.measure("utils.format_balances", utils.format_balances, balances, all_users)
+    runner.measure(
+        "utils.calculate_user_expense_details", utils.calculate_user_expense_details,
+        user_expenses, user_splits, user
+    )
+
+
+def run_scale(app, fake, args, expenses):
+    from fastapi.testclient import TestClient
+
+    tables = synthetic_tables(args.users, expenses, args.splits_per_expense, args.groups, args.seed)
+    fake.reset(tables)
+    fake.execute_rpc("rebuild_user_balances", {})
+    fake.execute_rpc("snapshot_due_balances", {})
+    fake.calls = 0
+
+    runner = Runner(fake, args.iterations, args.warm)
+    rng = random.Random(args.seed)
+    with TestClient(app) as client:
+        run_endpoints(runner, client, tables, rng)
+    asyncio.run(run_helpers(runner, tables, rng))
+
+    return {
+        "users": args.users,
+        "expenses": expenses,
+        "splits": len(tables["expense_splits"]),
+        "results": runner.results
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def print_scale(scale, baseline=None):
+    print(f"\n{scale['users']} users, {scale['expenses']} expenses, {scale['splits']} splits")
+    for name, result in scale["results"].items():
+        line = (f"  {name:<42} p50 {result['p50_ms']:>10.3f} ms  "
+                f"p95 {result['p95_ms']:>10.3f} ms  db calls {result['db_calls']:>6}")
+        previous = (baseline or {}).get(name)
+        if previous and result["p50_ms"]:
+            line += f"  ({previous['p50_ms'] / result['p50_ms']:.2f}x vs baseline)"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Endpoint and helper benchmark suite")
+    parser.add_argument("--expenses", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--splits-per-expense", type=int, default=4)
+    parser.add_argument("--groups", type=int, default=10)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=0.0,
+                        help="simulated round trip added to every Supabase call")
+    parser.add_argument("--warm", action="store_true",
+                        help="keep the user name and PDF caches between iterations")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare against")
+    args = parser.parse_args()
+
+    fake = FakeSupabase(latency=args.latency_ms / 1000)
+    app = install(fake)
+
+    baselines = {}
+    if args.compare:
+        with open(args.compare) as f:
+            baselines = {scale["expenses"]: scale["results"] for scale in json.load(f)["scales"]}
+
+    run = {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": vars(args)
+        },
+        "scales": []
+    }
+    for expenses in args.expenses:
+        scale = run_scale(app, fake, args, expenses)
+        run["scales"].append(scale)
+        print_scale(scale, baselines.get(expenses))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(run, f, indent=2)
+        print(f"\nresults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,45 @@ from functools import lru_cache
 class Settings(BaseSettings):
     SUPABASE_URL: str
     SUPABASE_KEY: str
+    # threads used to run blocking Supabase calls off the event loop
+    DB_MAX_WORKERS: int = 16
+    # HTTP connection pool of the Supabase client (keep DB_POOL_SIZE at
+    # least DB_MAX_WORKERS so worker threads never wait for a connection)
+    DB_POOL_SIZE: int = 16
+    DB_POOL_KEEPALIVE: int = 16
+    DB_KEEPALIVE_EXPIRY_SECONDS: float = 30.0
+    DB_HTTP2: bool = True
+    DB_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    DB_TIMEOUT_SECONDS: float = 30.0
+    # retries of idempotent reads after connection errors and timeouts,
+    # with exponential backoff starting at DB_RETRY_BACKOFF_SECONDS
+    DB_RETRIES: int = 2
+    DB_RETRY_BACKOFF_SECONDS: float = 0.1
+    # id -> name cache for users
+    USER_CACHE_TTL_SECONDS: int = 300
+    USER_CACHE_MAX_SIZE: int = 10000
+    # expenses inserted per import_expenses call
+    IMPORT_BATCH_SIZE: int = 500
+    # PDF rendering processes (also the cap on concurrent renders) and cache
+    PDF_MAX_WORKERS: int = 2
+    PDF_CACHE_TTL_SECONDS: int = 3600
+    PDF_CACHE_MAX_SIZE: int = 128
+    # background export jobs: "memory" or "sqlite" (kept across restarts)
+    JOB_STORE: str = "memory"
+    JOB_STORE_PATH: str = "jobs.sqlite3"
+    JOB_WORKERS: int = 2
+    # seconds a process holds its unfinished jobs without renewing before
+    # another may take them over, and seconds finished jobs are kept
+    JOB_LEASE_SECONDS: int = 60
+    JOB_RESULT_TTL_SECONDS: int = 3600
+    # expenses fetched per page by the streaming exports
+    EXPORT_PAGE_SIZE: int = 1000
+    # rows per request when loading the whole ledger for balance checks
+    LEDGER_PAGE_SIZE: int = 1000
+    # balance change events: events buffered per subscriber (the oldest are
+    # dropped beyond this) and seconds between keepalives on idle streams
+    EVENT_QUEUE_SIZE: int = 100
+    EVENT_KEEPALIVE_SECONDS: float = 15.0
 
     class Config:
         env_file = ".env"
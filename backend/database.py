@@ -1,15 +1,150 @@
-from supabase import create_client
+import time
+import random
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from config import get_settings
+from helpers.metrics import metrics, query_target, request_line
 
 settings = get_settings()
 
-# Error handling while connecting to Supabase
-try:
-    supabase = create_client(
-        settings.SUPABASE_URL,
-        settings.SUPABASE_KEY
+_client = None
+_http_client = None
+_client_lock = threading.Lock()
+_in_flight = 0
+
+
+def create_http_client(session):
+    # One pooled, keep-alive HTTP client shared by every Supabase call. It
+    # replaces the session postgrest created, keeping its class, base URL
+    # and auth headers: the locked supabase-py (2.9) cannot be handed an
+    # httpx client and only exposes a timeout option.
+    import httpx
+
+    return type(session)(
+        base_url=session.base_url,
+        headers=session.headers,
+        http2=settings.DB_HTTP2,
+        follow_redirects=True,
+        limits=httpx.Limits(
+            max_connections=settings.DB_POOL_SIZE,
+            max_keepalive_connections=settings.DB_POOL_KEEPALIVE,
+            keepalive_expiry=settings.DB_KEEPALIVE_EXPIRY_SECONDS
+        ),
+        timeout=httpx.Timeout(
+            settings.DB_TIMEOUT_SECONDS,
+            connect=settings.DB_CONNECT_TIMEOUT_SECONDS
+        )
+    )
+
+
+def get_client():
+    # Created on first use rather than at import: supabase-py is slow to
+    # import, and the app should start even while the database is down.
+    global _client, _http_client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from supabase import create_client
+
+                # Error handling while connecting to Supabase
+                try:
+                    client = create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
+                    # The app only uses the anon key, so the postgrest client
+                    # (reset by supabase-py on sign-in) keeps this session
+                    postgrest = client.postgrest
+                    _http_client = create_http_client(postgrest.session)
+                    postgrest.session.close()
+                    postgrest.session = _http_client
+                    _client = client
+                    print("Successfully connected to Supabase")
+                except Exception as e:
+                    print(f"Error connecting to Supabase: {str(e)}")
+                    raise e
+    return _client
+
+
+def set_client(client):
+    # Replaces the client, e.g. with the in-memory one the benchmarks use
+    global _client
+    _client = client
+
+
+class LazyClient:
+    # Lets modules keep `from database import supabase` and call
+    # `supabase.table(...)` without creating the client at import time
+
+    def __getattr__(self, name):
+        return getattr(get_client(), name)
+
+
+supabase = LazyClient()
+
+query_executor = ThreadPoolExecutor(
+    max_workers=settings.DB_MAX_WORKERS,
+    thread_name_prefix="supabase"
+)
+
+def pool_stats():
+    # Open, idle and in-flight counts; connection counts are only known for
+    # the real client's httpx pool
+    stats = {
+        "max_connections": settings.DB_POOL_SIZE,
+        "in_flight": _in_flight
+    }
+    pool = getattr(getattr(_http_client, "_transport", None), "_pool", None)
+    if pool is not None:
+        connections = pool.connections
+        idle = sum(1 for connection in connections if connection.is_idle())
+        stats["connections"] = {"active": len(connections) - idle, "idle": idle}
+    return stats
+
+
+def is_transient(error):
+    # Connection failures and timeouts, not errors returned by PostgREST
+    import httpx
+
+    return isinstance(error, httpx.TransportError)
+
+
+def warm_up():
+    # Creates the client in the background so the first request does not
+    # wait for it; a failure is printed and retried on first use
+    query_executor.submit(get_client)
+
+
+async def run_query(query, retry=None):
+    # supabase-py executes synchronously; keep it off the event loop.
+    # GET requests are retried on transient failures; pass retry=True for
+    # other calls that are safe to repeat, such as read-only RPCs.
+    global _in_flight
+    loop = asyncio.get_running_loop()
+    target = query_target(query)
+    if retry is None:
+        retry = request_line(query)[0] == "GET"
+    attempts = settings.DB_RETRIES + 1 if retry else 1
+
+    for attempt in range(attempts):
+        started = time.perf_counter()
+        _in_flight += 1
+        try:
+            response = await loop.run_in_executor(query_executor, query.execute)
+            break
+        except Exception as e:
+            if attempt + 1 == attempts or not is_transient(e):
+                raise
+            metrics.inc("db_retries_total", target=target)
+        finally:
+            _in_flight -= 1
+            metrics.observe(
+                "db_query_duration_seconds", time.perf_counter() - started, target=target
+            )
+        # exponential backoff with jitter so retries do not arrive together
+        await asyncio.sleep(settings.DB_RETRY_BACKOFF_SECONDS * 2 ** attempt * random.uniform(0.5, 1))
+
+    data = response.data
+    metrics.inc(
+        "db_rows_total", len(data) if isinstance(data, list) else int(data is not None),
+        target=target
     )
-    print("Successfully connected to Supabase")
-except Exception as e:
-    print(f"Error connecting to Supabase: {str(e)}")
-    raise e
\ No newline at end of file
+    return response
\ No newline at end of file
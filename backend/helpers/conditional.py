@@ -0,0 +1,36 @@
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from fastapi import Request, Response
+from helpers.ledger import get_ledger_version
+
+
+async def ledger_validators(group_id=None):
+    # ETag and Last-Modified for responses derived from the ledger of one
+    # group, or of all expenses
+    version = await get_ledger_version(group_id)
+    scope = str(group_id) if group_id else "all"
+    headers = {
+        "ETag": f'"{scope}.{version["version"]}"',
+        "Cache-Control": "no-cache"
+    }
+    if version.get("updated_at"):
+        updated_at = datetime.fromisoformat(str(version["updated_at"]).replace("Z", "+00:00"))
+        headers["Last-Modified"] = format_datetime(
+            updated_at.astimezone(timezone.utc), usegmt=True
+        )
+    return headers
+
+
+def is_not_modified(request: Request, headers):
+    # Weak comparison, as If-None-Match requires
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return headers["ETag"] in tags
+
+
+def not_modified(headers):
+    return Response(status_code=304, headers=headers)
@@ -0,0 +1,158 @@
+import asyncio
+import json
+from collections import defaultdict
+from contextlib import contextmanager
+from config import get_settings
+from helpers.money import to_paise, from_paise
+
+# Balance change events for the /events/balances stream. Every created
+# expense publishes the pairwise changes its splits make, so subscribers
+# can keep balances current without polling /balance-sheet. Events go
+# through a broker so that, with several workers, every worker's
+# subscribers see every event; MemoryBroker is the in-process stand-in for
+# a shared one (e.g. Redis pub/sub or Postgres LISTEN/NOTIFY) and is enough
+# for a single worker.
+
+settings = get_settings()
+
+
+def balance_changes(expense):
+    # (debtor, creditor) -> paise the expense adds to what debtor owes
+    # creditor, from the expense's own splits only
+    changes = defaultdict(int)
+    payer = str(expense['created_by'])
+    for split in expense.get('splits') or []:
+        debtor = str(split['user_id'])
+        if debtor != payer and split['amount'] is not None:
+            changes[debtor, payer] += to_paise(split['amount'])
+    return changes
+
+
+def balance_event(expense):
+    return {
+        "type": "balances_changed",
+        "expense_id": str(expense['id']),
+        "group_id": str(expense['group_id']) if expense.get('group_id') else None,
+        "created_at": expense.get('created_at'),
+        "changes": [
+            {
+                "from_user": debtor,
+                "to_user": creditor,
+                "amount": from_paise(amount),
+                "direction": "owes"
+            }
+            for (debtor, creditor), amount in balance_changes(expense).items()
+        ]
+    }
+
+
+class MemoryBroker:
+    # Messages are JSON strings, as they would be on a shared broker
+
+    def __init__(self):
+        self._listeners = []
+
+    def listen(self, callback):
+        self._listeners.append(callback)
+
+    async def publish(self, message):
+        for callback in list(self._listeners):
+            callback(message)
+
+
+class Subscription:
+    __slots__ = ("user_id", "group_id", "queue", "dropped")
+
+    def __init__(self, user_id, group_id, queue_size):
+        self.user_id = user_id
+        self.group_id = group_id
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+
+    def matches(self, event):
+        if self.group_id and event["group_id"] != self.group_id:
+            return False
+        return self.user_id is None or any(
+            self.user_id in (change["from_user"], change["to_user"])
+            for change in event["changes"]
+        )
+
+    def put(self, event):
+        # a slow subscriber loses its oldest events rather than holding up
+        # the publisher
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+    def view(self, event):
+        # the event as this subscriber sees it: only its own pairs
+        if self.user_id is None:
+            return event
+        return {**event, "changes": [
+            change for change in event["changes"]
+            if self.user_id in (change["from_user"], change["to_user"])
+        ]}
+
+
+class BalanceEvents:
+
+    def __init__(self, broker, queue_size=100):
+        self.broker = broker
+        self.queue_size = queue_size
+        self._subscriptions = set()
+        broker.listen(self._deliver)
+
+    def __len__(self):
+        return len(self._subscriptions)
+
+    async def publish(self, event):
+        await self.broker.publish(json.dumps(event))
+
+    def _deliver(self, message):
+        event = json.loads(message)
+        for subscription in list(self._subscriptions):
+            if subscription.matches(event):
+                subscription.put(event)
+
+    @contextmanager
+    def subscribe(self, user_id=None, group_id=None):
+        subscription = Subscription(
+            str(user_id) if user_id else None,
+            str(group_id) if group_id else None,
+            self.queue_size
+        )
+        self._subscriptions.add(subscription)
+        try:
+            yield subscription
+        finally:
+            self._subscriptions.discard(subscription)
+
+
+async def publish_expense(expense):
+    # Called once create_expense has committed. A failed publish is logged
+    # and never fails the request: the expense is already saved.
+    try:
+        await balance_events.publish(balance_event(expense))
+    except Exception as e:
+        print(f"Error publishing balance changes: {str(e)}")
+
+
+async def iter_sse(subscription):
+    # text/event-stream frames, with a comment line as keepalive so proxies
+    # keep idle connections open. Runs until Starlette cancels the response
+    # when the client disconnects.
+    yield "retry: 3000\n\n"
+    while True:
+        try:
+            event = await asyncio.wait_for(
+                subscription.queue.get(), settings.EVENT_KEEPALIVE_SECONDS
+            )
+        except asyncio.TimeoutError:
+            yield ": keepalive\n\n"
+            continue
+        data = json.dumps(subscription.view(event))
+        yield f"id: {event['expense_id']}\nevent: {event['type']}\ndata: {data}\n\n"
+
+
+balance_events = BalanceEvents(MemoryBroker(), queue_size=settings.EVENT_QUEUE_SIZE)
@@ -0,0 +1,43 @@
+import csv
+import json
+from io import StringIO
+
+# One CSV row per split, carrying the expense fields of /e/all alongside it
+CSV_COLUMNS = [
+    "expense_id", "name", "description", "amount", "date", "split_type",
+    "paid_by", "user_name", "split_amount", "percentage", "type"
+]
+
+
+def summary_csv_rows(summary):
+    expense = [
+        summary["expense_id"], summary["name"], summary["description"] or "",
+        summary["amount"], summary["date"], summary["split_type"], summary["paid_by"]
+    ]
+    for split in summary["splits"]:
+        yield expense + [
+            split["user_name"],
+            split["amount"],
+            "" if split["percentage"] is None else split["percentage"],
+            split["type"]
+        ]
+
+
+async def iter_csv(pages):
+    # One chunk per page keeps memory bounded by the page size
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_COLUMNS)
+    async for summaries in pages:
+        for summary in summaries:
+            writer.writerows(summary_csv_rows(summary))
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+async def iter_ndjson(pages):
+    async for summaries in pages:
+        yield "".join(json.dumps(summary) + "\n" for summary in summaries)
@@ -0,0 +1,204 @@
+import asyncio
+import codecs
+import csv
+import json
+from pydantic import ValidationError
+from config import get_settings
+from database import supabase, run_query
+from schema.expense import ExpenseCreate
+from schema.user import UserCreate
+from helpers.splits import validate_splits, expense_row, split_rows
+from helpers.events import publish_expense
+
+settings = get_settings()
+
+# CSV imports carry one expense per line; `splits` holds the JSON array of
+# splits, e.g. [{"user_id": "...", "amount": 250}]. The optional columns may
+# be left out of the header, and blank cells in them are read as null.
+CSV_COLUMNS = ["name", "description", "amount", "created_by", "split_type", "splits"]
+OPTIONAL_CSV_COLUMNS = ["group_id"]
+
+
+async def iter_lines(chunks):
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    async for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    buffer += decoder.decode(b"", final=True)
+    if buffer:
+        yield buffer.rstrip("\r")
+
+
+async def iter_records(chunks, file_format):
+    # Yields (row number, record or parse error) as lines arrive
+    header = None
+    row = 0
+    async for line in iter_lines(chunks):
+        if not line.strip():
+            continue
+        if file_format == "csv" and header is None:
+            header = [column.strip() for column in next(csv.reader([line]))]
+            missing = [column for column in CSV_COLUMNS if column not in header]
+            if missing:
+                raise ValueError(f"CSV header is missing columns: {', '.join(missing)}")
+            continue
+
+        row += 1
+        try:
+            if file_format == "csv":
+                record = dict(zip(header, next(csv.reader([line]))))
+                record["description"] = record.get("description") or None
+                for column in OPTIONAL_CSV_COLUMNS:
+                    record[column] = record.get(column) or None
+                record["splits"] = json.loads(record.get("splits") or "[]")
+            else:
+                record = json.loads(line)
+            yield row, record
+        except (ValueError, csv.Error) as e:
+            yield row, e
+
+
+def validation_message(error):
+    return "; ".join(
+        f"{'.'.join(str(part) for part in detail['loc'])}: {detail['msg']}"
+        for detail in error.errors()
+    )
+
+
+def parse_expense(record):
+    # Returns (expense, error message)
+    if isinstance(record, Exception):
+        return None, f"Invalid record: {str(record)}"
+    try:
+        expense = ExpenseCreate.model_validate(record)
+    except ValidationError as e:
+        return None, validation_message(e)
+    return expense, validate_splits(expense)
+
+
+async def insert_expense_batch(batch):
+    # One RPC call and one transaction per batch; failing rows are rolled
+    # back individually and reported without aborting the rest.
+    try:
+        response = await run_query(supabase.rpc('import_expenses', {"p_rows": batch}))
+        return response.data
+    except Exception as e:
+        return [
+            {"row_index": item["row"], "created_expense_id": None,
+             "error_message": f"Batch failed: {str(e)}"}
+            for item in batch
+        ]
+
+
+async def import_expense_stream(chunks, file_format):
+    imported = 0
+    errors = []
+    batch = []
+    pending = None
+
+    async def collect(batch, results):
+        nonlocal imported
+        items = {item["row"]: item for item in batch}
+        for result in results:
+            if result["error_message"]:
+                errors.append({"row": result["row_index"], "error": result["error_message"]})
+                continue
+            imported += 1
+            # the same balances_changed event /add-expense publishes, from
+            # the rows sent for this expense
+            item = items[result["row_index"]]
+            await publish_expense({
+                **item["expense"],
+                "id": result["created_expense_id"],
+                "splits": item["splits"]
+            })
+
+    async for row, record in iter_records(chunks, file_format):
+        expense, error = parse_expense(record)
+        if error:
+            errors.append({"row": row, "error": error})
+            continue
+
+        batch.append({
+            "row": row,
+            "expense": expense_row(expense),
+            "splits": split_rows(expense)
+        })
+        if len(batch) >= settings.IMPORT_BATCH_SIZE:
+            # keep one batch in flight while the next one is parsed
+            if pending:
+                await collect(pending[0], await pending[1])
+            pending = (batch, asyncio.create_task(insert_expense_batch(batch)))
+            batch = []
+
+    if pending:
+        await collect(pending[0], await pending[1])
+    if batch:
+        await collect(batch, await insert_expense_batch(batch))
+
+    errors.sort(key=lambda error: error["row"])
+    return {
+        "imported": imported,
+        "failed": len(errors),
+        "errors": errors
+    }
+
+
+def parse_user(record):
+    # Returns (user, error message)
+    try:
+        return UserCreate.model_validate(record), None
+    except ValidationError as e:
+        return None, validation_message(e)
+
+
+async def insert_user_batch(batch):
+    # Like insert_expense_batch: one RPC call per batch, with duplicate
+    # emails and mobiles reported per row
+    try:
+        response = await run_query(supabase.rpc('import_users', {"p_rows": batch}))
+        return response.data
+    except Exception as e:
+        return [
+            {"row_index": item["row"], "created_user_id": None,
+             "error_message": f"Batch failed: {str(e)}"}
+            for item in batch
+        ]
+
+
+async def import_users(records):
+    # Rows are numbered from 1 in request order. Batches run one after the
+    # other, so when two rows share an email or mobile the first one wins.
+    created = []
+    errors = []
+    batch = []
+
+    def collect(results):
+        for result in results:
+            if result["error_message"]:
+                errors.append({"row": result["row_index"], "error": result["error_message"]})
+            else:
+                created.append({"row": result["row_index"], "id": result["created_user_id"]})
+
+    for row, record in enumerate(records, start=1):
+        user, error = parse_user(record)
+        if error:
+            errors.append({"row": row, "error": error})
+            continue
+        batch.append({"row": row, "user": user.model_dump()})
+        if len(batch) >= settings.IMPORT_BATCH_SIZE:
+            collect(await insert_user_batch(batch))
+            batch = []
+    if batch:
+        collect(await insert_user_batch(batch))
+
+    errors.sort(key=lambda error: error["row"])
+    return {
+        "created": len(created),
+        "failed": len(errors),
+        "users": created,
+        "errors": errors
+    }
@@ -0,0 +1,290 @@
+import asyncio
+import os
+import socket
+import sqlite3
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+# Background export jobs. A job moves pending -> running -> done | failed;
+# the store keeps job records and finished results so clients can poll.
+# Finished jobs and their results are purged once they are `result_ttl`
+# seconds old.
+#
+# Several app processes may share one SQLiteJobStore. Every unfinished job
+# belongs to the queue that submitted or took it over, which renews a lease
+# on it while it is alive; a job is only taken over by another queue once
+# its lease has run out, and only its owner may start running it.
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+def utc_now(seconds=0):
+    return (datetime.now(timezone.utc) + timedelta(seconds=seconds)).isoformat()
+
+
+class MemoryJobStore:
+    # Leases only matter to a shared store; this one is used by one process
+
+    def __init__(self, max_jobs=1000):
+        self.max_jobs = max_jobs
+        self._jobs = OrderedDict()
+        self._results = {}
+        self._leases = {}
+
+    def create(self, job, owner, lease_until):
+        self._jobs[job["id"]] = dict(job)
+        self._leases[job["id"]] = (owner, lease_until)
+        while len(self._jobs) > self.max_jobs:
+            job_id, _ = self._jobs.popitem(last=False)
+            self._forget(job_id)
+
+    def _forget(self, job_id):
+        self._results.pop(job_id, None)
+        self._leases.pop(job_id, None)
+
+    def update(self, job_id, **fields):
+        if job_id in self._jobs:
+            self._jobs[job_id].update(fields)
+
+    def get(self, job_id):
+        job = self._jobs.get(job_id)
+        return dict(job) if job else None
+
+    def set_result(self, job_id, result):
+        self._results[job_id] = result
+
+    def get_result(self, job_id):
+        return self._results.get(job_id)
+
+    def claim(self, job_id, owner):
+        job = self._jobs.get(job_id)
+        if job is None or job["status"] != PENDING or self._leases[job_id][0] != owner:
+            return False
+        job["status"] = RUNNING
+        return True
+
+    def renew(self, owner, lease_until):
+        for job_id, (job_owner, _) in self._leases.items():
+            if job_owner == owner:
+                self._leases[job_id] = (owner, lease_until)
+
+    def take_expired(self, owner, lease_until, now):
+        taken = []
+        for job_id, job in self._jobs.items():
+            if job["status"] in (PENDING, RUNNING) and self._leases[job_id][1] < now:
+                job["status"] = PENDING
+                self._leases[job_id] = (owner, lease_until)
+                taken.append(job_id)
+        return taken
+
+    def purge(self, finished_before):
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job["status"] in (DONE, FAILED) and job["finished_at"] < finished_before
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+            self._forget(job_id)
+        return len(expired)
+
+
+class SQLiteJobStore:
+    # Survives restarts: unfinished jobs are taken over again once the
+    # leases of the process that held them run out
+    COLUMNS = ["id", "kind", "user_id", "group_id", "status", "filename", "error",
+               "created_at", "finished_at"]
+
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._db:
+            self._db.execute(
+                "create table if not exists jobs ("
+                "id text primary key, kind text not null, user_id text not null, group_id text, "
+                "status text not null, filename text, error text, "
+                "created_at text not null, finished_at text, result blob, "
+                "owner text, lease_until text)"
+            )
+            # stores created before jobs had owners
+            existing = {row[1] for row in self._db.execute("pragma table_info(jobs)")}
+            for column in ("owner", "lease_until"):
+                if column not in existing:
+                    self._db.execute(f"alter table jobs add column {column} text")
+
+    def create(self, job, owner, lease_until):
+        columns = [*self.COLUMNS, "owner", "lease_until"]
+        with self._lock, self._db:
+            self._db.execute(
+                f"insert into jobs ({', '.join(columns)}) "
+                f"values ({', '.join('?' for _ in columns)})",
+                [*(job.get(column) for column in self.COLUMNS), owner, lease_until]
+            )
+
+    def update(self, job_id, **fields):
+        assignments = ", ".join(f"{column} = ?" for column in fields)
+        with self._lock, self._db:
+            self._db.execute(
+                f"update jobs set {assignments} where id = ?",
+                [*fields.values(), job_id]
+            )
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._db.execute(
+                f"select {', '.join(self.COLUMNS)} from jobs where id = ?", [job_id]
+            ).fetchone()
+        return dict(zip(self.COLUMNS, row)) if row else None
+
+    def set_result(self, job_id, result):
+        with self._lock, self._db:
+            self._db.execute("update jobs set result = ? where id = ?", [result, job_id])
+
+    def get_result(self, job_id):
+        with self._lock:
+            row = self._db.execute("select result from jobs where id = ?", [job_id]).fetchone()
+        return row[0] if row else None
+
+    def claim(self, job_id, owner):
+        # conditional, so of the processes that queued a job only one runs it
+        with self._lock, self._db:
+            cursor = self._db.execute(
+                "update jobs set status = ? where id = ? and status = ? and owner = ?",
+                [RUNNING, job_id, PENDING, owner]
+            )
+        return cursor.rowcount == 1
+
+    def renew(self, owner, lease_until):
+        with self._lock, self._db:
+            self._db.execute(
+                "update jobs set lease_until = ? where owner = ? and status in (?, ?)",
+                [lease_until, owner, PENDING, RUNNING]
+            )
+
+    def take_expired(self, owner, lease_until, now):
+        with self._lock, self._db:
+            expired = [row[0] for row in self._db.execute(
+                "select id from jobs where status in (?, ?) "
+                "and (lease_until is null or lease_until < ?) order by created_at",
+                [PENDING, RUNNING, now]
+            )]
+            taken = []
+            for job_id in expired:
+                # another process may have taken it since the select
+                cursor = self._db.execute(
+                    "update jobs set status = ?, owner = ?, lease_until = ? "
+                    "where id = ? and status in (?, ?) "
+                    "and (lease_until is null or lease_until < ?)",
+                    [PENDING, owner, lease_until, job_id, PENDING, RUNNING, now]
+                )
+                if cursor.rowcount == 1:
+                    taken.append(job_id)
+        return taken
+
+    def purge(self, finished_before):
+        with self._lock, self._db:
+            cursor = self._db.execute(
+                "delete from jobs where status in (?, ?) and finished_at < ?",
+                [DONE, FAILED, finished_before]
+            )
+        return cursor.rowcount
+
+
+class JobQueue:
+    # Runs jobs on a fixed number of asyncio workers; `handlers` maps a job
+    # kind to a coroutine function taking the job's user_id and group_id and
+    # returning (filename, result bytes).
+
+    def __init__(self, store, handlers, workers, lease_seconds=60, result_ttl=3600):
+        self.store = store
+        self.handlers = handlers
+        self.workers = workers
+        self.lease_seconds = lease_seconds
+        self.result_ttl = result_ttl
+        # unique per process and per queue, also across hosts sharing a store
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._queue = asyncio.Queue()
+        self._tasks = []
+
+    async def start(self):
+        await self.maintain()
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._maintain()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def maintain(self):
+        # Renews this queue's leases, takes over the jobs of queues whose
+        # leases ran out and purges expired results
+        lease_until = utc_now(self.lease_seconds)
+        await asyncio.to_thread(self.store.renew, self.owner, lease_until)
+        for job_id in await asyncio.to_thread(
+            self.store.take_expired, self.owner, lease_until, utc_now()
+        ):
+            self._queue.put_nowait(job_id)
+        await asyncio.to_thread(self.store.purge, utc_now(-self.result_ttl))
+
+    async def _maintain(self):
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                await self.maintain()
+            except Exception as e:
+                print(f"Error maintaining export jobs: {str(e)}")
+
+    async def submit(self, kind, user_id, group_id=None):
+        job = {
+            "id": uuid.uuid4().hex,
+            "kind": kind,
+            "user_id": str(user_id),
+            "group_id": str(group_id) if group_id else None,
+            "status": PENDING,
+            "filename": None,
+            "error": None,
+            "created_at": utc_now(),
+            "finished_at": None
+        }
+        await asyncio.to_thread(
+            self.store.create, job, self.owner, utc_now(self.lease_seconds)
+        )
+        self._queue.put_nowait(job["id"])
+        return job
+
+    async def get(self, job_id):
+        return await asyncio.to_thread(self.store.get, job_id)
+
+    async def get_result(self, job_id):
+        return await asyncio.to_thread(self.store.get_result, job_id)
+
+    async def _work(self):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id):
+        job = await asyncio.to_thread(self.store.get, job_id)
+        if job is None or not await asyncio.to_thread(self.store.claim, job_id, self.owner):
+            return
+        try:
+            filename, result = await self.handlers[job["kind"]](job["user_id"], job["group_id"])
+            await asyncio.to_thread(self.store.set_result, job_id, result)
+            await asyncio.to_thread(
+                self.store.update, job_id,
+                status=DONE, filename=filename, finished_at=utc_now()
+            )
+        except Exception as e:
+            await asyncio.to_thread(
+                self.store.update, job_id,
+                status=FAILED, error=str(e), finished_at=utc_now()
+            )
@@ -0,0 +1,169 @@
+import argparse
+import asyncio
+from collections import defaultdict
+from database import supabase, run_query
+from helpers.utils import (
+    get_ledger_columns, calculate_ledger_balances, iter_table_pages, fetch_all_pages,
+    user_names
+)
+from helpers.money import to_paise, from_paise
+from helpers.metrics import timed
+from helpers.projections import columns
+
+# unique key of user_balances, for paging through it
+LEDGER_KEYS = ('group_id', 'debtor_id', 'creditor_id')
+
+
+@timed("fetch")
+async def get_ledger_balances(group_id=None):
+    # Pairwise balances for one group, or summed over all groups. Read page
+    # by page: a ledger can hold more pairs than one response may carry.
+    def build_query():
+        query = supabase.table('user_balances').select(
+            columns('user_balances', 'balance', *LEDGER_KEYS)
+        )
+        if group_id:
+            query = query.eq('group_id', str(group_id))
+        return query
+
+    balances = defaultdict(lambda: defaultdict(int))
+    async for rows in iter_table_pages(build_query, keys=LEDGER_KEYS):
+        for row in rows:
+            balances[row['debtor_id']][row['creditor_id']] += to_paise(row['amount'])
+    return balances
+
+
+@timed("fetch")
+async def get_ledger_version(group_id=None):
+    # Counter bumped by every write that changes balances or listings, for
+    # one group or (group_id=None) for all expenses
+    response = await run_query(supabase.rpc(
+        'ledger_version', {"p_group_id": str(group_id) if group_id else None}
+    ), retry=True)
+    version = response.data[0]
+    _observe_names_version(version["names_version"])
+    return version
+
+
+# names version this worker last saw
+_seen_names_version = None
+
+
+def _observe_names_version(names_version):
+    # Renames on any worker bump the names version (expense writes do not),
+    # so a change means this worker's cached names may be stale. Dropping
+    # them keeps an old name from being served under the new ETag.
+    global _seen_names_version
+    if names_version != _seen_names_version:
+        user_names.invalidate()
+        _seen_names_version = names_version
+
+
+def _timestamp(value):
+    return value.isoformat() if value else None
+
+
+@timed("fetch")
+async def get_pair_balances(since=None, until=None, group_id=None, user_id=None):
+    # Rows of debtor_id, creditor_id and amount for the expenses created in
+    # [since, until), including payers' own shares (debtor == creditor).
+    # Without `since` they are cumulative up to `until`, read from the
+    # nearest monthly snapshot plus the expenses after it. There is one row
+    # per pair, so the result is paged by pair past the max_rows cap.
+    params = {
+        "p_since": _timestamp(since),
+        "p_until": _timestamp(until),
+        "p_group_id": str(group_id) if group_id else None,
+        "p_user_id": str(user_id) if user_id else None
+    }
+    # read-only function, so safe to retry
+    return await fetch_all_pages(
+        lambda: supabase.rpc('pair_balances', params),
+        keys=('debtor_id', 'creditor_id'), retry=True
+    )
+
+
+async def get_window_balances(since=None, until=None, group_id=None):
+    # Same shape as get_ledger_balances, for a time window
+    balances = defaultdict(lambda: defaultdict(int))
+    for row in await get_pair_balances(since, until, group_id):
+        if row['debtor_id'] != row['creditor_id']:
+            balances[row['debtor_id']][row['creditor_id']] += to_paise(row['amount'])
+    return balances
+
+
+async def snapshot_balances():
+    # Snapshots every month boundary passed since the latest snapshot
+    response = await run_query(supabase.rpc('snapshot_due_balances', {}))
+    return response.data
+
+
+async def rebuild_ledger():
+    await run_query(supabase.rpc('rebuild_user_balances', {}))
+
+
+async def find_ledger_drift():
+    columns, actual = await asyncio.gather(get_ledger_columns(), get_ledger_balances())
+    expected = calculate_ledger_balances(columns)
+
+    drift = []
+    pairs = {
+        (debtor, creditor)
+        for balances in (expected, actual)
+        for debtor, creditors in balances.items()
+        for creditor in creditors
+    }
+    for debtor, creditor in sorted(pairs):
+        expected_amount = expected.get(debtor, {}).get(creditor, 0)
+        actual_amount = actual.get(debtor, {}).get(creditor, 0)
+        if expected_amount != actual_amount:
+            drift.append({
+                "debtor_id": debtor,
+                "creditor_id": creditor,
+                "expected": from_paise(expected_amount),
+                "actual": from_paise(actual_amount)
+            })
+    return drift
+
+
+async def check_ledger(rebuild=False):
+    drift = await find_ledger_drift()
+    for row in drift:
+        print(
+            f"{row['debtor_id']} -> {row['creditor_id']}: "
+            f"expected {row['expected']:.2f}, ledger has {row['actual']:.2f}"
+        )
+    print(f"{len(drift)} drifted pair(s)")
+
+    if drift and rebuild:
+        await rebuild_ledger()
+        remaining = await find_ledger_drift()
+        print(f"Ledger rebuilt, {len(remaining)} drifted pair(s) remaining")
+        return 1 if remaining else 0
+
+    return 1 if drift else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Verify or rebuild the user_balances ledger, or snapshot it"
+    )
+    parser.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="recompute the ledger from expenses and splits if drift is found"
+    )
+    parser.add_argument(
+        "--snapshot",
+        action="store_true",
+        help="take the monthly balance snapshots that are due instead"
+    )
+    args = parser.parse_args()
+    if args.snapshot:
+        print(f"{asyncio.run(snapshot_balances())} snapshot(s) taken")
+        return 0
+    return asyncio.run(check_ledger(args.rebuild))
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,147 @@
+import time
+import asyncio
+import functools
+from bisect import bisect_left
+
+# Upper bounds, in seconds, of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        index = bisect_left(self.buckets, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+
+
+class Metrics:
+    # Process-level histograms and counters rendered in the Prometheus text
+    # format. Only touched from the event loop, so no locking is needed.
+
+    def __init__(self):
+        self.histograms = {}
+        self.counters = {}
+        self.gauges = {}
+        self.descriptions = {}
+
+    def describe(self, name, description):
+        self.descriptions[name] = description
+
+    def observe(self, name, value, **labels):
+        series = self.histograms.setdefault(name, {})
+        key = tuple(sorted(labels.items()))
+        if key not in series:
+            series[key] = Histogram()
+        series[key].observe(value)
+
+    def inc(self, name, amount=1, **labels):
+        series = self.counters.setdefault(name, {})
+        key = tuple(sorted(labels.items()))
+        series[key] = series.get(key, 0) + amount
+
+    def set(self, name, value, **labels):
+        self.gauges.setdefault(name, {})[tuple(sorted(labels.items()))] = value
+
+    def render(self):
+        lines = []
+        for name, series in sorted(self.gauges.items()):
+            lines.extend(self._header(name, "gauge"))
+            for key, value in series.items():
+                lines.append(f"{name}{_labels(key)} {value}")
+        for name, series in sorted(self.counters.items()):
+            lines.extend(self._header(name, "counter"))
+            for key, value in series.items():
+                lines.append(f"{name}{_labels(key)} {value}")
+        for name, series in sorted(self.histograms.items()):
+            lines.extend(self._header(name, "histogram"))
+            for key, histogram in series.items():
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_labels(key, le=bound)} {cumulative}")
+                lines.append(f"{name}_bucket{_labels(key, le='+Inf')} {histogram.count}")
+                lines.append(f"{name}_sum{_labels(key)} {histogram.sum:.6f}")
+                lines.append(f"{name}_count{_labels(key)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def _header(self, name, kind):
+        if name in self.descriptions:
+            yield f"# HELP {name} {self.descriptions[name]}"
+        yield f"# TYPE {name} {kind}"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(key, **extra):
+    pairs = list(key) + list(extra.items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{label}="{_escape(value)}"' for label, value in pairs) + "}"
+
+
+metrics = Metrics()
+metrics.describe("http_request_duration_seconds", "Time to response start per route")
+metrics.describe("db_query_duration_seconds", "Supabase round trips per table or RPC")
+metrics.describe("db_rows_total", "Rows returned by Supabase per table or RPC")
+metrics.describe("db_retries_total", "Supabase reads retried after a transient failure")
+metrics.describe("db_queries_in_flight", "Supabase calls currently running or queued")
+metrics.describe("db_pool_connections", "Open connections in the Supabase HTTP pool")
+metrics.describe("db_pool_max_connections", "Size limit of the Supabase HTTP pool")
+metrics.describe("event_subscribers", "Open /events/balances streams in this worker")
+metrics.describe("phase_duration_seconds", "Time spent in fetch, calculate, format and PDF phases")
+
+
+def request_line(query):
+    # (HTTP method, path) of a postgrest query builder. The locked postgrest
+    # (0.17) keeps them on the builder; later versions on `query.request`.
+    source = getattr(query, "request", query)
+    return getattr(source, "http_method", None), str(getattr(source, "path", "unknown"))
+
+
+def query_target(query):
+    # "users" for table queries, "rpc/<name>" for RPCs
+    path = request_line(query)[1]
+    name = path.rstrip("/").rsplit("/", 1)[-1]
+    return f"rpc/{name}" if "/rpc/" in path else name
+
+
+def timed(phase):
+    # Records the duration of each call under phase_duration_seconds,
+    # labelled with the phase and the function name
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    metrics.observe(
+                        "phase_duration_seconds", time.perf_counter() - started,
+                        phase=phase, function=func.__name__
+                    )
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                metrics.observe(
+                    "phase_duration_seconds", time.perf_counter() - started,
+                    phase=phase, function=func.__name__
+                )
+        return wrapper
+    return decorator
@@ -0,0 +1,98 @@
+import sys
+from array import array
+from collections import defaultdict
+from helpers.money import to_paise
+
+
+class LedgerColumns:
+    # Compact copy of the expenses and splits needed for whole-ledger
+    # balances. User ids are coded as small ints, and each split is three
+    # machine integers in parallel arrays (expense position, user code and
+    # amount in paise) instead of a dict of strings. Rows can be added page
+    # by page, so the raw rows never have to be held all at once.
+
+    __slots__ = (
+        "user_ids", "user_codes", "expense_positions", "payers",
+        "split_expenses", "split_users", "split_amounts"
+    )
+
+    def __init__(self):
+        self.user_ids = []
+        self.user_codes = {}
+        self.expense_positions = {}
+        # per expense: payer code
+        self.payers = array('i')
+        # per split: expense position (-1 when the expense is unknown),
+        # user code and amount in paise
+        self.split_expenses = array('i')
+        self.split_users = array('i')
+        self.split_amounts = array('q')
+
+    @classmethod
+    def from_rows(cls, expenses, splits):
+        columns = cls()
+        columns.add_expenses(expenses)
+        columns.add_splits(splits)
+        return columns
+
+    def __len__(self):
+        return len(self.split_amounts)
+
+    def user_code(self, user_id):
+        code = self.user_codes.get(user_id)
+        if code is None:
+            code = self.user_codes[user_id] = len(self.user_ids)
+            self.user_ids.append(sys.intern(user_id))
+        return code
+
+    def add_expenses(self, expenses):
+        # expenses must be added before their splits
+        for expense in expenses:
+            self.expense_positions[expense['id']] = len(self.payers)
+            self.payers.append(self.user_code(expense['created_by']))
+
+    def add_splits(self, splits):
+        positions = self.expense_positions
+        for split in splits:
+            if split['amount'] is None:
+                continue
+            self.split_expenses.append(positions.get(split['expense_id'], -1))
+            self.split_users.append(self.user_code(split['user_id']))
+            self.split_amounts.append(to_paise(split['amount']))
+
+    def nbytes(self):
+        # approximate retained size, strings and dict entries included
+        size = sys.getsizeof(self.user_ids) + sys.getsizeof(self.user_codes)
+        size += sum(sys.getsizeof(user_id) for user_id in self.user_ids)
+        size += sys.getsizeof(self.expense_positions)
+        size += sum(sys.getsizeof(expense_id) for expense_id in self.expense_positions)
+        for column in (self.payers, self.split_expenses, self.split_users, self.split_amounts):
+            size += column.buffer_info()[1] * column.itemsize
+        return size
+
+    def balances(self, user_id=None):
+        # Same result as utils.calculate_balances_python, pair order
+        # included: splits are visited in expense order
+        user_code = None
+        if user_id is not None:
+            user_code = self.user_codes.get(str(user_id), -1)
+
+        positions, users, amounts, payers = (
+            self.split_expenses, self.split_users, self.split_amounts, self.payers
+        )
+        totals = defaultdict(int)
+        for index in sorted(range(len(positions)), key=positions.__getitem__):
+            position = positions[index]
+            if position < 0:
+                continue
+            debtor = users[index]
+            payer = payers[position]
+            if debtor == payer:
+                continue
+            if user_code is None or debtor == user_code or payer == user_code:
+                totals[debtor, payer] += amounts[index]
+
+        balances = defaultdict(lambda: defaultdict(int))
+        for (debtor, payer), total in totals.items():
+            balances[self.user_ids[debtor]][self.user_ids[payer]] += total
+        return balances
@@ -0,0 +1,47 @@
+from decimal import Decimal, ROUND_HALF_UP
+
+# Amounts are handled as integer paise (1/100 rupee) everywhere in the
+# balance pipeline and only turned back into rupees at the API boundary.
+
+
+def to_paise(amount):
+    if isinstance(amount, int):
+        return amount * 100
+    if isinstance(amount, float):
+        # exact for values stored with two decimal places
+        return int(round(amount * 100))
+    return int((Decimal(str(amount)) * 100).to_integral_value(rounding=ROUND_HALF_UP))
+
+
+def from_paise(paise):
+    return paise / 100
+
+
+def paise_to_decimal(paise):
+    return Decimal(paise).scaleb(-2)
+
+
+def split_equally(total, parts):
+    # The first `remainder` participants absorb one extra paisa each
+    base, remainder = divmod(total, parts)
+    return [base + 1] * remainder + [base] * (parts - remainder)
+
+
+def split_by_percentage(total, percentages):
+    # Largest remainder method: shares always add up to `total`, and leftover
+    # paise go to the largest fractional parts (earlier splits win ties).
+    weights = [int(Decimal(str(percentage)) * 100) for percentage in percentages]
+    total_weight = sum(weights)
+    if total_weight == 0:
+        raise ValueError("Percentages must not all be zero")
+
+    shares = []
+    fractions = []
+    for index, weight in enumerate(weights):
+        share, fraction = divmod(total * weight, total_weight)
+        shares.append(share)
+        fractions.append((-fraction, index))
+
+    for _, index in sorted(fractions)[:total - sum(shares)]:
+        shares[index] += 1
+    return shares
@@ -0,0 +1,178 @@
+## Balance sheet PDF layout, rendered in a process pool
+## (kept free of database imports so the spawned workers start quickly,
+## and ReportLab is only imported by the workers that render)
+
+import asyncio
+import multiprocessing
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from io import BytesIO
+from config import get_settings
+from helpers.cache import TTLCache
+from helpers.money import from_paise
+from helpers.metrics import timed
+
+settings = get_settings()
+
+# spawned workers avoid forking a process that already runs threads
+pdf_executor = ProcessPoolExecutor(
+    max_workers=settings.PDF_MAX_WORKERS,
+    mp_context=multiprocessing.get_context("spawn")
+)
+pdf_slots = asyncio.Semaphore(settings.PDF_MAX_WORKERS)
+
+# rendered PDFs, keyed by reports.generate_balance_sheet on what they depend
+# on, so a hit needs no fetching or computing
+pdf_cache = TTLCache(
+    ttl=settings.PDF_CACHE_TTL_SECONDS,
+    maxsize=settings.PDF_CACHE_MAX_SIZE
+)
+
+
+def balance_sheet_rows(expenses, splits, users, user_id):
+    # Table rows for the expenses the user created and the ones they share in
+    user_id = str(user_id)
+    splits_by_expense = defaultdict(list)
+    for split in splits:
+        splits_by_expense[split['expense_id']].append(split)
+    user_expenses = []
+    other_expenses = []
+
+    for expense in sorted(expenses, key=lambda x: x['created_at'], reverse=True):
+        expense_splits = splits_by_expense.get(expense['id'], [])
+        if expense['created_by'] == user_id:
+            participants = ", ".join([users[split['user_id']] for split in expense_splits])
+            user_expenses.append([
+                datetime.fromisoformat(expense['created_at']).strftime('%Y-%m-%d'),
+                expense['name'],
+                f"Rs. {expense['amount']:.2f}",
+                expense['split_type'],
+                participants
+            ])
+        else:  # show others' expenses
+            user_split = next((s for s in expense_splits if s['user_id'] == user_id), None)
+            if user_split:
+                other_expenses.append([
+                    users[expense['created_by']],
+                    expense['name'],
+                    f"Rs. {expense['amount']:.2f}",
+                    expense['split_type'],
+                    f"Rs. {user_split['amount']:.2f}"
+                ])
+
+    return user_expenses, other_expenses
+
+
+def render_balance_sheet(user_name, generated_on, paid, owed, user_expenses, other_expenses):
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import letter
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.lib.units import inch
+
+    # Create a PDF buffer
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(
+        buffer,
+        pagesize=letter,
+        rightMargin=72,
+        leftMargin=72,
+        topMargin=72,
+        bottomMargin=72
+    )
+
+    # Styles
+    styles = getSampleStyleSheet()
+    title_style = styles['Heading1']
+    subtitle_style = styles['Heading2']
+    normal_style = styles['Normal']
+
+    # Content elements in a balance sheet
+    elements = []
+
+    # Default sections
+    elements.append(Paragraph(f"Expense Balance Sheet", title_style))
+    elements.append(Paragraph(f"User: {user_name}", subtitle_style))
+    elements.append(Paragraph(f"Generated on: {generated_on}", normal_style))
+    elements.append(Spacer(1, 20))
+
+    # The user's summary
+    elements.append(Paragraph("Your Summary", subtitle_style))
+    summary_data = [
+        ["Total Paid", f"Rs. {from_paise(paid):.2f}"],
+        ["Total Owed", f"Rs. {from_paise(owed):.2f}"],
+        ["Net Balance", f"Rs. {from_paise(paid - owed):.2f}"]
+    ]
+    summary_table = Table(summary_data, colWidths=[2*inch, 2*inch])
+    summary_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, -1), colors.lightgrey),
+        ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 12),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ]))
+    elements.append(summary_table)
+    elements.append(Spacer(1, 20))
+
+    # User expenses section
+    elements.append(Paragraph("Your Expenses", subtitle_style))
+    headers = ["Date", "Description", "Amount", "Split Type", "Participants"]
+
+    if user_expenses:  # If there are expenses for the user
+        expenses_table = Table([headers] + user_expenses, colWidths=[1*inch, 2*inch, 1*inch, 1*inch, 2*inch])
+        expenses_table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 12),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black),
+            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 1), (-1, -1), 10),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ]))
+        elements.append(expenses_table)
+    else:
+        elements.append(Paragraph("No expenses created by you", normal_style))
+
+    elements.append(Spacer(1, 20))
+
+    # All expenses section
+    elements.append(Paragraph("Overall Group Expenses", subtitle_style))
+    headers = ["Paid By", "Description", "Amount", "Split Type", "Your Share"]
+
+    if other_expenses:  # If there are expenses
+        overall_table = Table([headers] + other_expenses, colWidths=[1.5*inch, 2*inch, 1*inch, 1*inch, 1.5*inch])
+        overall_table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 12),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black),
+            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 1), (-1, -1), 10),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ]))
+        elements.append(overall_table)
+    else:
+        elements.append(Paragraph("No expenses from others", normal_style))
+
+    doc.build(elements)
+    return buffer.getvalue()
+
+
+@timed("pdf")
+async def build_balance_sheet_pdf(user_name, generated_on, paid, owed,
+                                  user_expenses, other_expenses):
+    async with pdf_slots:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            pdf_executor, render_balance_sheet,
+            user_name, generated_on, paid, owed, user_expenses, other_expenses
+        )
@@ -0,0 +1,33 @@
+# Columns each read path asks PostgREST for, instead of select('*'). The
+# "balance" projections are the thin ones for computing balances; "detail"
+# adds what the expense listings, user details and PDFs show.
+PROJECTIONS = {
+    'expenses': {
+        'balance': 'id,created_by',
+        'detail': 'id,created_at,name,description,amount,created_by,split_type'
+    },
+    'expense_splits': {
+        'balance': 'expense_id,user_id,amount',
+        'detail': 'expense_id,user_id,amount,percentage'
+    },
+    'user_balances': {
+        'balance': 'debtor_id,creditor_id,amount'
+    },
+    'users': {
+        'name': 'id,name',
+        # schema.user.UserResponse
+        'profile': 'email,name,mobile'
+    },
+    'groups': {
+        # schema.group.GroupResponse
+        'detail': 'id,name,created_by,created_at'
+    }
+}
+
+
+def columns(table, projection, *extra):
+    # select() string for a table's projection, plus any extra columns the
+    # query itself needs (e.g. `id` for keyset pagination)
+    names = PROJECTIONS[table][projection].split(',')
+    names += [name for name in extra if name not in names]
+    return ','.join(names)
@@ -0,0 +1,72 @@
+from datetime import datetime
+from config import get_settings
+from helpers.utils import (
+    get_users,
+    get_user_expenses_and_splits,
+    get_related_user_ids,
+    calculate_user_expense_details
+)
+from helpers.ledger import get_ledger_version
+from helpers.pdf import balance_sheet_rows, build_balance_sheet_pdf, pdf_cache
+from helpers.jobs import JobQueue, MemoryJobStore, SQLiteJobStore
+
+settings = get_settings()
+
+
+async def render_user_balance_sheet(user_id, group_id, generated_on):
+    # Returns (user name, pdf bytes), fetching everything the PDF shows
+    expenses, splits = await get_user_expenses_and_splits(user_id, group_id)
+    users = await get_users(
+        [user_id] + get_related_user_ids(expenses, splits)
+    )
+    user_name = users.get(str(user_id))
+    if user_name is None:
+        raise ValueError("User not found")
+
+    paid, owed, balances_by_user = calculate_user_expense_details(expenses, splits, user_id)
+    user_expenses, other_expenses = balance_sheet_rows(expenses, splits, users, user_id)
+
+    # Rendered off the event loop
+    pdf = await build_balance_sheet_pdf(
+        user_name,
+        generated_on,
+        paid,
+        owed,
+        user_expenses,
+        other_expenses
+    )
+    return user_name, pdf
+
+
+async def generate_balance_sheet(user_id, group_id=None):
+    # Returns (filename, pdf bytes) for a user's balance sheet. Apart from
+    # the date it shows, a PDF changes only with the ledger version (bumped
+    # by expense writes and renames), so a cached one is found before
+    # anything is fetched.
+    generated_on = datetime.now().strftime('%B %d, %Y')
+    version = await get_ledger_version(group_id)
+    key = (str(user_id), str(group_id) if group_id else None, version["version"], generated_on)
+
+    cached = pdf_cache.get(key)
+    if cached is None:
+        cached = await render_user_balance_sheet(user_id, group_id, generated_on)
+        pdf_cache.set(key, cached)
+    user_name, pdf = cached
+
+    filename = f"balance_sheet_{user_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
+    return filename, pdf
+
+
+def create_job_store():
+    if settings.JOB_STORE == "sqlite":
+        return SQLiteJobStore(settings.JOB_STORE_PATH)
+    return MemoryJobStore()
+
+
+export_jobs = JobQueue(
+    create_job_store(),
+    {"balance_sheet": generate_balance_sheet},
+    settings.JOB_WORKERS,
+    lease_seconds=settings.JOB_LEASE_SECONDS,
+    result_ttl=settings.JOB_RESULT_TTL_SECONDS
+)
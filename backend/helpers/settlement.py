@@ -0,0 +1,37 @@
+import heapq
+from collections import defaultdict
+
+
+def net_positions(balances):
+    # balances[debtor][creditor] = paise; positive net means the user is owed
+    positions = defaultdict(int)
+    for debtor, creditors in balances.items():
+        for creditor, paise in creditors.items():
+            positions[debtor] -= paise
+            positions[creditor] += paise
+    return positions
+
+
+def simplify_debts(balances):
+    # Greedily settle the largest debtor against the largest creditor. Every
+    # step clears at least one user, so there are at most n - 1 transfers and
+    # the whole plan costs O(n log n) in the number of users. Amounts are paise.
+    positions = net_positions(balances)
+    creditors = [(-paise, user) for user, paise in positions.items() if paise > 0]
+    debtors = [(paise, user) for user, paise in positions.items() if paise < 0]
+    heapq.heapify(creditors)
+    heapq.heapify(debtors)
+
+    transfers = []
+    while creditors and debtors:
+        credit, creditor = heapq.heappop(creditors)
+        debt, debtor = heapq.heappop(debtors)
+        paise = min(-credit, -debt)
+        transfers.append((debtor, creditor, paise))
+
+        if -credit > paise:
+            heapq.heappush(creditors, (credit + paise, creditor))
+        if -debt > paise:
+            heapq.heappush(debtors, (debt + paise, debtor))
+
+    return transfers
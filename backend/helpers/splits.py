@@ -0,0 +1,61 @@
+from schema.expense import SplitType
+from helpers.money import (
+    to_paise,
+    paise_to_decimal,
+    split_equally,
+    split_by_percentage
+)
+
+
+def validate_splits(expense):
+    # Returns an error message, or None when the splits are valid
+    if not expense.splits:
+        return "At least one split is required"
+
+    if expense.split_type == SplitType.PERCENTAGE:
+        total_percentage = sum(split.percentage or 0 for split in
+                               expense.splits)
+        if abs(total_percentage - 100) > 0.01:
+            return "Percentage splits must sum to 100%"
+    elif expense.split_type == SplitType.EXACT:
+        total_amount = sum(to_paise(split.amount or 0) for split in expense.splits)
+        if total_amount != to_paise(expense.amount):
+            return "Exact splits must sum to total amount"
+
+    return None
+
+
+def split_amounts(expense):
+    # Split amounts in paise, always adding up to the expense amount
+    total = to_paise(expense.amount)
+    if expense.split_type == SplitType.EQUAL:
+        return split_equally(total, len(expense.splits))
+    if expense.split_type == SplitType.EXACT:
+        return [to_paise(split.amount or 0) for split in expense.splits]
+    return split_by_percentage(
+        total, [split.percentage or 0 for split in expense.splits]
+    )
+
+
+def expense_row(expense):
+    return {
+        "name": expense.name,
+        "description": expense.description,
+        "amount": str(expense.amount),
+        "created_by": str(expense.created_by),
+        "split_type": expense.split_type.value,
+        "group_id": str(expense.group_id) if expense.group_id else None
+    }
+
+
+def split_rows(expense):
+    rows = []
+    for split, amount in zip(expense.splits, split_amounts(expense)):
+        row = {
+            "user_id": str(split.user_id),
+            "amount": str(paise_to_decimal(amount))
+        }
+        if expense.split_type == SplitType.PERCENTAGE:
+            row["percentage"] = str(split.percentage or 0)
+        rows.append(row)
+    return rows
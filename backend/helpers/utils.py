@@ -1,30 +1,330 @@
-from database import supabase
+import asyncio
+import base64
+import json
+from database import supabase, run_query
 from collections import defaultdict
+from config import get_settings
+from helpers.cache import TTLCache
+from helpers.money import to_paise, from_paise
+from helpers.model import LedgerColumns
+from helpers.projections import columns
+from helpers.metrics import timed
+from helpers import vectorized
 
-def get_users():
-    users_response = supabase.table('users').select('*').execute()
-    return {user['id']: user['name'] for user in users_response.data}
+# keeps `in.(...)` filters well within URL length limits
+IN_FILTER_CHUNK_SIZE = 100
 
-def get_expenses():
-    return supabase.table('expenses').select('*').execute()
+settings = get_settings()
 
-def get_splits():
-    return supabase.table('expense_splits').select('*').execute()
+user_names = TTLCache(
+    ttl=settings.USER_CACHE_TTL_SECONDS,
+    maxsize=settings.USER_CACHE_MAX_SIZE
+)
 
+@timed("fetch")
+async def get_users(user_ids):
+    # id -> name for the given ids; only ids missing from the cache are fetched
+    users = {}
+    missing = []
+    for user_id in dict.fromkeys(str(user_id) for user_id in user_ids):
+        name = user_names.get(user_id)
+        if name is None:
+            missing.append(user_id)
+        else:
+            users[user_id] = name
+
+    responses = await asyncio.gather(*(
+        run_query(supabase.table('users').select(columns('users', 'name')).in_('id', ids))
+        for ids in chunked(missing)
+    ))
+    for response in responses:
+        for user in response.data:
+            user_names.set(user['id'], user['name'])
+            users[user['id']] = user['name']
+    return users
+
+@timed("fetch")
+async def get_expenses(projection='detail'):
+    # every expense, as a list of rows
+    return await fetch_all_pages(
+        lambda: supabase.table('expenses').select(columns('expenses', projection, 'id'))
+    )
+
+@timed("fetch")
+async def get_splits(projection='detail'):
+    # every split, as a list of rows
+    return await fetch_all_pages(
+        lambda: supabase.table('expense_splits').select(
+            columns('expense_splits', projection, 'id')
+        )
+    )
+
+def keyset_after(keys, values):
+    # PostgREST `or` filter for the rows after `values` in `keys` order,
+    # with nulls first: (a, b) > (x, y) is a > x or (a = x and b > y)
+    clauses = []
+    for index, (key, value) in enumerate(zip(keys, values)):
+        conditions = [
+            f'{previous}.is.null' if equal is None else f'{previous}.eq."{equal}"'
+            for previous, equal in zip(keys[:index], values[:index])
+        ]
+        conditions.append(f'{key}.not.is.null' if value is None else f'{key}.gt."{value}"')
+        clauses.append(
+            conditions[0] if len(conditions) == 1 else f"and({','.join(conditions)})"
+        )
+    return ",".join(clauses)
+
+async def iter_table_pages(build_query, page_size=None, keys=('id',), retry=None):
+    # Keyset pages ordered by `keys` (unique together, nulls first), so
+    # reads are complete despite the server's max_rows cap. Stops at the
+    # first empty page, so a cap below page_size cannot end it early.
+    # `build_query` may also be a set-returning rpc(); `retry` is passed on
+    # to run_query.
+    page_size = page_size or settings.LEDGER_PAGE_SIZE
+    last = None
+    while True:
+        query = build_query()
+        for key in keys:
+            query = query.order(key, nullsfirst=True)
+        query = query.limit(page_size)
+        if last is not None:
+            if len(keys) == 1:
+                query = query.gt(keys[0], last[0])
+            else:
+                query = query.or_(keyset_after(keys, last))
+        rows = (await run_query(query, retry=retry)).data
+        if not rows:
+            return
+        yield rows
+        last = [rows[-1][key] for key in keys]
+
+async def fetch_all_pages(build_query, keys=('id',), retry=None):
+    rows = []
+    async for page in iter_table_pages(build_query, keys=keys, retry=retry):
+        rows += page
+    return rows
+
+@timed("fetch")
+async def get_ledger_columns():
+    # Every expense and split as LedgerColumns, fetched page by page with
+    # only the columns balances need, so the raw rows are never all in memory
+    ledger = LedgerColumns()
+    async for expenses in iter_table_pages(
+        lambda: supabase.table('expenses').select(columns('expenses', 'balance', 'id'))
+    ):
+        ledger.add_expenses(expenses)
+    async for splits in iter_table_pages(
+        lambda: supabase.table('expense_splits').select(
+            columns('expense_splits', 'balance', 'id')
+        )
+    ):
+        ledger.add_splits(splits)
+    return ledger
+
+def chunked(values, size=IN_FILTER_CHUNK_SIZE):
+    values = list(values)
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+def get_related_user_ids(expenses, splits):
+    return [expense['created_by'] for expense in expenses] + [
+        split['user_id'] for split in splits
+    ]
+
+@timed("fetch")
+async def get_user_expenses_and_splits(
+    user_id, group_id=None, since=None, until=None, projection='detail'
+):
+    # Only the rows a user takes part in: expenses they created with all
+    # their splits, and the user's splits on others' expenses with those
+    # expenses. With a group, only that group's expenses are considered,
+    # and with since/until only expenses created in [since, until).
+    user_id = str(user_id)
+    expense_columns = columns('expenses', projection, 'id')
+    split_columns = columns('expense_splits', projection, 'id')
+
+    def build_expenses_query():
+        query = supabase.table('expenses').select(expense_columns).eq('created_by', user_id)
+        if group_id:
+            query = query.eq('group_id', str(group_id))
+        if since:
+            query = query.gte('created_at', since.isoformat())
+        if until:
+            query = query.lt('created_at', until.isoformat())
+        return query
+
+    def build_splits_query():
+        if not (group_id or since or until):
+            return supabase.table('expense_splits').select(split_columns).eq('user_id', user_id)
+        query = supabase.table('expense_splits').select(
+            f'{split_columns},expenses!inner(group_id,created_at)'
+        ).eq('user_id', user_id)
+        if group_id:
+            query = query.eq('expenses.group_id', str(group_id))
+        if since:
+            query = query.gte('expenses.created_at', since.isoformat())
+        if until:
+            query = query.lt('expenses.created_at', until.isoformat())
+        return query
+
+    # both reads are paged: a user's history can run past max_rows
+    expenses, user_splits = await asyncio.gather(
+        fetch_all_pages(build_expenses_query), fetch_all_pages(build_splits_query)
+    )
+
+    created_ids = [expense['id'] for expense in expenses]
+    created = set(created_ids)
+    other_ids = list(dict.fromkeys(
+        split['expense_id'] for split in user_splits
+        if split['expense_id'] not in created
+    ))
+
+    # a chunk of expenses can have more than max_rows splits, so those are
+    # paged too; a chunk of expenses by id never can
+    split_queries = [
+        fetch_all_pages(lambda ids=ids: supabase.table('expense_splits').select(
+            split_columns
+        ).in_('expense_id', ids).neq('user_id', user_id))
+        for ids in chunked(created_ids)
+    ]
+    expense_queries = [
+        run_query(supabase.table('expenses').select(expense_columns).in_('id', ids))
+        for ids in chunked(other_ids)
+    ]
+    responses = await asyncio.gather(*split_queries, *expense_queries)
+
+    splits = list(user_splits)
+    for rows in responses[:len(split_queries)]:
+        splits += rows
+    for response in responses[len(split_queries):]:
+        expenses += response.data
+
+    return expenses, splits
+
+def encode_cursor(expense):
+    raw = json.dumps([expense['created_at'], expense['id']])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor):
+    created_at, expense_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    return created_at, expense_id
+
+@timed("fetch")
+async def get_expense_page(limit, cursor=None, group_id=None):
+    # Keyset pagination on (created_at, id), newest first
+    query = supabase.table('expenses').select(columns('expenses', 'detail')).order(
+        'created_at', desc=True
+    ).order('id', desc=True).limit(limit)
+    if group_id:
+        query = query.eq('group_id', str(group_id))
+    if cursor:
+        created_at, expense_id = decode_cursor(cursor)
+        query = query.or_(
+            f'created_at.lt."{created_at}",'
+            f'and(created_at.eq."{created_at}",id.lt.{expense_id})'
+        )
+    expenses = (await run_query(query)).data
+
+    # paged per chunk: a chunk of expenses can have more than max_rows splits
+    pages = await asyncio.gather(*(
+        fetch_all_pages(lambda ids=ids: supabase.table('expense_splits').select(
+            columns('expense_splits', 'detail', 'id')
+        ).in_('expense_id', ids))
+        for ids in chunked(expense['id'] for expense in expenses)
+    ))
+    splits = [split for rows in pages for split in rows]
+
+    next_cursor = encode_cursor(expenses[-1]) if len(expenses) == limit else None
+    return expenses, splits, next_cursor
+
+@timed("fetch")
+async def get_expense_overview(group_id=None):
+    # read-only function, so safe to retry
+    response = await run_query(supabase.rpc(
+        'expense_overview', {"p_group_id": str(group_id) if group_id else None}
+    ), retry=True)
+    overview = response.data[0]
+    return {
+        "total_expenses": overview['total_expenses'],
+        "total_amount": float(overview['total_amount']),
+        "average_amount": float(overview['average_amount'])
+    }
+
+@timed("format")
+def build_expense_summaries(expenses, splits, users):
+    splits_by_expense = group_splits_by_expense(splits)
+    expense_summaries = []
+
+    for expense in expenses:
+        split_details = []
+        for split in splits_by_expense.get(expense['id'], []):
+            split_details.append({
+                "user_name": users[split['user_id']],
+                "amount": split['amount'],
+                "percentage": split['percentage'],
+                "type": "paid" if split['user_id'] == expense['created_by']
+                else "owes"
+            })
+
+        # Create expense summary
+        expense_summaries.append({
+            "expense_id": expense['id'],
+            "name": expense['name'],
+            "description": expense['description'],
+            "amount": expense['amount'],
+            "date": expense['created_at'],
+            "split_type": expense['split_type'],
+            "paid_by": users[expense['created_by']],
+            "splits": split_details
+        })
+
+    return expense_summaries
+
+async def iter_expense_summary_pages(page_size, cursor=None, group_id=None):
+    while True:
+        expenses, splits, cursor = await get_expense_page(page_size, cursor, group_id)
+        users = await get_users(get_related_user_ids(expenses, splits))
+        yield build_expense_summaries(expenses, splits, users)
+        if cursor is None:
+            break
+
+def group_splits_by_expense(splits):
+    splits_by_expense = defaultdict(list)
+    for split in splits:
+        splits_by_expense[split['expense_id']].append(split)
+    return splits_by_expense
+
+@timed("calculate")
 def calculate_balances(expenses, splits, user_id=None):
-    balances = defaultdict(lambda: defaultdict(float))
+    # Dict rows stay on the pure-Python path; large ledgers are reduced with
+    # NumPy through calculate_ledger_balances instead
+    return calculate_balances_python(expenses, splits, user_id)
+
+@timed("calculate")
+def calculate_ledger_balances(columns, user_id=None):
+    # calculate_balances for a LedgerColumns, whose arrays NumPy reads
+    # directly
+    if len(columns) >= vectorized.VECTORIZE_MIN_SPLITS and vectorized.is_available():
+        return vectorized.calculate_ledger_vectorized(columns, user_id)
+    return columns.balances(user_id)
+
+def calculate_balances_python(expenses, splits, user_id=None):
+    # amounts in paise
+    balances = defaultdict(lambda: defaultdict(int))
+    splits_by_expense = group_splits_by_expense(splits)
     for expense in expenses:
-        expense_splits = [split for split in splits if split['expense_id'] == expense['id']]
+        expense_splits = splits_by_expense.get(expense['id'], [])
         payer_id = expense['created_by']
         
         for split in expense_splits:
             split_user_id = split['user_id']
             if user_id is None or split_user_id == user_id or payer_id == user_id:
                 if split_user_id != payer_id:
-                    balances[split_user_id][payer_id] += split['amount']
+                    balances[split_user_id][payer_id] += to_paise(split['amount'])
     
     return balances
 
+@timed("format")
 def format_balances(balances, users):
     formatted_balances = []
     processed_pairs = set()
@@ -32,30 +332,33 @@ def format_balances(balances, users):
     for user1, user_balances in balances.items():
         for user2, amount in user_balances.items():
             pair_key = tuple(sorted([user1, user2]))
-            if pair_key not in processed_pairs and abs(amount) > 0.01:
+            if pair_key not in processed_pairs and amount != 0:
                 processed_pairs.add(pair_key)
                 formatted_balances.append({
                     "from_user": {"id": user1, "name": users[user1]},
                     "to_user": {"id": user2, "name": users[user2]},
-                    "amount": abs(amount),
+                    "amount": from_paise(abs(amount)),
                     "direction": "owes"
                 })
     
     return formatted_balances
 
+@timed("calculate")
 def calculate_user_expense_details(expenses, splits, user_id):
+    # paid, owed and per-user totals are in paise
     paid = 0
     owed = 0
     balances_by_user = defaultdict(lambda: {"total": 0, "expenses": []})
+    splits_by_expense = group_splits_by_expense(splits)
     
     for expense in expenses:
-        expense_splits = [s for s in splits if s['expense_id'] == expense['id']]
+        expense_splits = splits_by_expense.get(expense['id'], [])
         
         if expense['created_by'] == str(user_id):
-            paid += expense['amount']
+            paid += to_paise(expense['amount'])
             for split in expense_splits:
                 if split['user_id'] != str(user_id):
-                    balances_by_user[split['user_id']]["total"] += split['amount']
+                    balances_by_user[split['user_id']]["total"] += to_paise(split['amount'])
                     balances_by_user[split['user_id']]["expenses"].append({
                         "expense_name": expense['name'],
                         "description": expense['description'],
@@ -67,8 +370,8 @@ def calculate_user_expense_details(expenses, splits, user_id):
         else:
             for split in expense_splits:
                 if split['user_id'] == str(user_id):
-                    owed += split['amount']
-                    balances_by_user[expense['created_by']]["total"] -= split['amount']
+                    owed += to_paise(split['amount'])
+                    balances_by_user[expense['created_by']]["total"] -= to_paise(split['amount'])
                     balances_by_user[expense['created_by']]["expenses"].append({
                         "expense_name": expense['name'],
                         "description": expense['description'],
@@ -79,3 +382,25 @@ def calculate_user_expense_details(expenses, splits, user_id):
                     })
     
     return paid, owed, balances_by_user
+
+@timed("calculate")
+def calculate_user_totals(pair_balances, user_id):
+    # calculate_user_expense_details from aggregated pair balances (see
+    # ledger.get_pair_balances) rather than expenses, so without the
+    # per-expense details
+    user_id = str(user_id)
+    paid = 0
+    owed = 0
+    balances_by_user = defaultdict(lambda: {"total": 0, "expenses": []})
+
+    for row in pair_balances:
+        amount = to_paise(row['amount'])
+        if row['creditor_id'] == user_id:
+            paid += amount
+            if row['debtor_id'] != user_id:
+                balances_by_user[row['debtor_id']]["total"] += amount
+        elif row['debtor_id'] == user_id:
+            owed += amount
+            balances_by_user[row['creditor_id']]["total"] -= amount
+
+    return paid, owed, balances_by_user
@@ -0,0 +1,112 @@
+from collections import defaultdict
+
+# NumPy is optional: without it callers stay on the pure-Python path. It is
+# imported on first use so small ledgers never pay for loading it.
+np = None
+_numpy_checked = False
+
+# below this many splits of a LedgerColumns, loading NumPy costs more than
+# the reduction saves
+VECTORIZE_MIN_SPLITS = 50000
+
+
+def is_available():
+    global np, _numpy_checked
+    if not _numpy_checked:
+        try:
+            import numpy
+            np = numpy
+        except ImportError:
+            pass
+        _numpy_checked = True
+    return np is not None
+
+
+def balance_columns(expenses, splits):
+    # Integer-coded columns: per split the expense position, debtor code and
+    # amount in paise; per expense the payer code.
+    user_index = {}
+    expense_position = {}
+    payer_codes = []
+    for position, expense in enumerate(expenses):
+        expense_position[expense['id']] = position
+        payer_codes.append(user_index.setdefault(expense['created_by'], len(user_index)))
+
+    positions = np.array(
+        [expense_position.get(split['expense_id'], -1) for split in splits],
+        dtype=np.int64
+    )
+    debtors = np.array(
+        [user_index.setdefault(split['user_id'], len(user_index)) for split in splits],
+        dtype=np.int64
+    )
+    # each amount is rounded to whole paise on its own, which is exact for
+    # amounts of up to 10 digits; sums are only ever taken in int64
+    amounts = np.rint(
+        np.array([split['amount'] for split in splits], dtype=np.float64) * 100
+    ).astype(np.int64)
+    payers = np.array(payer_codes, dtype=np.int64)
+    return list(user_index), positions, debtors, amounts, payers
+
+
+def reduce_balance_columns(user_ids, positions, debtors, amounts, payers, user_code=None):
+    # visit splits in expense order, as the pure-Python loop does
+    order = np.argsort(positions, kind='stable')
+    positions, debtors, amounts = positions[order], debtors[order], amounts[order]
+
+    known = positions >= 0
+    positions, debtors, amounts = positions[known], debtors[known], amounts[known]
+    split_payers = payers[positions]
+
+    mask = debtors != split_payers
+    if user_code is not None:
+        mask &= (debtors == user_code) | (split_payers == user_code)
+    debtors, split_payers, amounts = debtors[mask], split_payers[mask], amounts[mask]
+
+    user_count = max(len(user_ids), 1)
+    keys = debtors * user_count + split_payers
+    pairs, first_seen, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    # summed in int64: bincount's weights would sum in float64, which stops
+    # being exact once totals pass 2**53 paise
+    totals = np.zeros(len(pairs), dtype=np.int64)
+    np.add.at(totals, inverse.ravel(), amounts)
+
+    # keep pairs in the order they are first seen
+    order = np.argsort(first_seen, kind='stable')
+    pairs = pairs[order]
+    totals = totals[order]
+
+    balances = defaultdict(lambda: defaultdict(int))
+    for debtor, payer, total in zip(
+        (pairs // user_count).tolist(),
+        (pairs % user_count).tolist(),
+        totals.tolist()
+    ):
+        balances[user_ids[debtor]][user_ids[payer]] += total
+    return balances
+
+
+def calculate_ledger_vectorized(columns, user_id=None):
+    # Same as calculate_balances_vectorized for a LedgerColumns, whose
+    # arrays are read without copying them into lists first
+    positions = np.frombuffer(columns.split_expenses, dtype=np.int32).astype(np.int64)
+    debtors = np.frombuffer(columns.split_users, dtype=np.int32).astype(np.int64)
+    amounts = np.frombuffer(columns.split_amounts, dtype=np.int64)
+    payers = np.frombuffer(columns.payers, dtype=np.int32).astype(np.int64)
+    user_code = None
+    if user_id is not None:
+        user_code = columns.user_codes.get(str(user_id), -1)
+    return reduce_balance_columns(
+        columns.user_ids, positions, debtors, amounts, payers, user_code
+    )
+
+
+def calculate_balances_vectorized(expenses, splits, user_id=None):
+    # Same result as calculate_balances_python, pair order included. Not
+    # used for dict rows: building their columns costs about what the
+    # reduction saves (see benchmarks.balances)
+    user_ids, positions, debtors, amounts, payers = balance_columns(expenses, splits)
+    user_code = None
+    if user_id is not None:
+        user_code = user_ids.index(user_id) if user_id in user_ids else -1
+    return reduce_balance_columns(user_ids, positions, debtors, amounts, payers, user_code)
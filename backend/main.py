@@ -1,19 +1,77 @@
-from fastapi import FastAPI
-from api import users, expenses, balance_sheet
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
+from api import users, expenses, balance_sheet, groups, events
 from config import get_settings
+from database import supabase, run_query, warm_up, pool_stats
+from helpers.metrics import metrics
+from helpers.utils import user_names
+from helpers.reports import export_jobs
+from helpers.events import balance_events
 
 settings = get_settings()
 
+@asynccontextmanager
+async def lifespan(app):
+    warm_up()
+    await export_jobs.start()
+    yield
+    await export_jobs.stop()
+
 app = FastAPI(
     title="Expense Sharing App (FastAPI)",
     description="API for managing shared expenses between users",
+    lifespan=lifespan,
 )
 
+@app.middleware("http")
+async def record_latency(request: Request, call_next):
+    # Measures time to response start; streamed bodies finish later
+    started = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    metrics.observe(
+        "http_request_duration_seconds", time.perf_counter() - started,
+        method=request.method,
+        route=route.path if route else "unmatched",
+        status=response.status_code
+    )
+    return response
+
 app.include_router(users.router)
 app.include_router(expenses.router)
 app.include_router(balance_sheet.router)
+app.include_router(groups.router)
+app.include_router(events.router)
 
 ## Health check Todo: can remove this
 @app.get("/health-check")
 async def health_check():
-    return {"status": "healthy"}
\ No newline at end of file
+    started = time.perf_counter()
+    try:
+        await run_query(supabase.table('users').select('id').limit(1))
+    except Exception as e:
+        return JSONResponse(
+            status_code=503,
+            content={"status": "unhealthy", "detail": f"Database unreachable: {str(e)}"}
+        )
+    return {
+        "status": "healthy",
+        "db_latency_ms": round((time.perf_counter() - started) * 1000, 2)
+    }
+
+@app.get("/cache-stats")
+async def cache_stats():
+    return {"user_names": user_names.stats()}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    # Prometheus text exposition format
+    pool = pool_stats()
+    metrics.set("db_queries_in_flight", pool["in_flight"])
+    metrics.set("db_pool_max_connections", pool["max_connections"])
+    metrics.set("event_subscribers", len(balance_events))
+    for state, count in pool.get("connections", {}).items():
+        metrics.set("db_pool_connections", count, state=state)
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
\ No newline at end of file
@@ -32,6 +32,7 @@ class ExpenseCreate(BaseModel):
     amount: _amount
     split_type: SplitType
     created_by: UUID
+    group_id: Optional[UUID] = None
     splits: List[ExpenseSplitCreate]
 
 class ExpenseResponse(BaseModel):
@@ -41,5 +42,6 @@ class ExpenseResponse(BaseModel):
     amount: float
     created_by: UUID
     split_type: SplitType
+    group_id: Optional[UUID] = None
     created_at: datetime
     splits: List[ExpenseSplitResponse]
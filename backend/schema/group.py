@@ -0,0 +1,13 @@
+from pydantic import BaseModel, Field
+from datetime import datetime
+from uuid import UUID
+
+class GroupCreate(BaseModel):
+    name: str = Field(min_length=1, max_length=100)
+    created_by: UUID
+
+class GroupResponse(BaseModel):
+    id: UUID
+    name: str
+    created_by: UUID
+    created_at: datetime
@@ -1,5 +1,6 @@
-from pydantic import BaseModel, EmailStr, StringConstraints
-from typing import Optional, Annotated
+from pydantic import BaseModel, EmailStr, Field, StringConstraints
+from typing import Dict, List, Optional, Annotated
+from uuid import UUID
 
 class UserCreate(BaseModel):
     email: EmailStr
@@ -12,6 +13,14 @@ class UserResponse(BaseModel):
     name: str
     mobile: Annotated[str, StringConstraints(pattern=r'^\+?91?\d{10}$')]
 
+class UserBatchGet(BaseModel):
+    ids: List[UUID] = Field(min_length=1, max_length=1000)
+
+class UserBatchResponse(BaseModel):
+    # UserResponse has no id, so users are keyed by it
+    users: Dict[str, UserResponse]
+    missing: List[str]
+
 class UserUpdate(BaseModel):
     name: Optional[str] = None
     mobile: Optional[str] = None
@@ -0,0 +1,67 @@
+import os
+import sys
+from collections import namedtuple
+import pytest
+
+# Tests import the app modules the way uvicorn does, from backend/. The
+# Supabase client is created lazily, so these settings are never used to
+# connect.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_KEY", "test")
+
+# The in-memory Supabase of benchmarks/fake_supabase.py, its synthetic
+# tables and a client for the app that reads from it
+Ledger = namedtuple("Ledger", ["fake", "tables", "client"])
+
+# benchmarks.suite.synthetic_tables sizes, plus the fake's max_rows cap;
+# parametrize `ledger` or `fresh_ledger` indirectly to change them
+LEDGER_DEFAULTS = {
+    "users": 20,
+    "expenses": 500,
+    "splits_per_expense": 4,
+    "groups": 0,
+    "seed": 0,
+    "max_rows": 1000
+}
+
+_shared_ledgers = {}
+
+
+def build_ledger(params):
+    from fastapi.testclient import TestClient
+    from benchmarks.fake_supabase import FakeSupabase
+    from benchmarks.suite import install, synthetic_tables
+
+    params = {**LEDGER_DEFAULTS, **params}
+    fake = FakeSupabase(max_rows=params["max_rows"])
+    app = install(fake)
+    tables = synthetic_tables(
+        params["users"], params["expenses"], params["splits_per_expense"],
+        params["groups"], params["seed"]
+    )
+    fake.reset(tables)
+    fake.execute_rpc("rebuild_user_balances", {})
+    fake.execute_rpc("snapshot_due_balances", {})
+    return Ledger(fake, tables, TestClient(app))
+
+
+@pytest.fixture
+def ledger(request):
+    # Shared by every test asking for the same sizes, so tests using it must
+    # not write to it; those take fresh_ledger
+    from database import set_client
+
+    params = getattr(request, "param", {})
+    key = tuple(sorted(params.items()))
+    if key not in _shared_ledgers:
+        _shared_ledgers[key] = build_ledger(params)
+    shared = _shared_ledgers[key]
+    set_client(shared.fake)
+    return shared
+
+
+@pytest.fixture
+def fresh_ledger(request):
+    # A ledger of its own, for tests that add expenses or rename users
+    return build_ledger(getattr(request, "param", {}))
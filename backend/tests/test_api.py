@@ -0,0 +1,132 @@
+from datetime import datetime, timezone
+import pytest
+
+
+def test_user_balance_sheet_until_is_itemised(ledger):
+    _, tables, client = ledger
+    user_id = tables["users"][0]["id"]
+    moment = datetime(2025, 3, 15, tzinfo=timezone.utc).isoformat()
+
+    until = client.get(f"/e/user/{user_id}", params={"until": moment})
+    as_of = client.get(f"/e/user/{user_id}", params={"as_of": moment})
+    assert until.status_code == as_of.status_code == 200
+
+    # the same totals, but only since/until lists the expenses behind them
+    totals = lambda body: (body["summary"], sorted(
+        (entry["user"]["id"], entry["total_amount"], entry["direction"])
+        for entry in body["detailed_balances"]
+    ))
+    assert totals(until.json()) == totals(as_of.json())
+    assert all(entry["expense_details"] for entry in until.json()["detailed_balances"])
+    assert not any(entry["expense_details"] for entry in as_of.json()["detailed_balances"])
+
+
+def test_cached_balance_sheet_pdf_reads_only_the_ledger_version(fresh_ledger):
+    from helpers.pdf import pdf_cache
+    fake, tables, client = fresh_ledger
+    user_id, other_id = tables["users"][1]["id"], tables["users"][2]["id"]
+    path = f"/balance-sheet/download/u/{user_id}"
+    pdf_cache.invalidate()
+
+    first = client.get(path)
+    assert first.status_code == 200
+    assert first.content.startswith(b"%PDF")
+
+    calls = fake.calls
+    assert client.get(path).content == first.content
+    assert fake.calls - calls == 1
+
+    # a new expense bumps the version, so the next download is rebuilt
+    assert client.post("/add-expense", json={
+        "name": "Taxi", "amount": 120, "created_by": user_id, "split_type": "EQUAL",
+        "splits": [{"user_id": user_id}, {"user_id": other_id}]
+    }).status_code == 200
+    calls = fake.calls
+    assert client.get(path).content != first.content
+    assert fake.calls - calls > 1
+
+
+def test_rename_on_another_worker_is_not_served_from_the_name_cache(fresh_ledger):
+    fake, tables, client = fresh_ledger
+    user_id = tables["users"][3]["id"]
+    names = lambda body: {
+        side["id"]: side["name"] for entry in body for side in (entry["from_user"], entry["to_user"])
+    }
+    before = client.get("/balance-sheet")
+    assert names(before.json())[user_id] == tables["users"][3]["name"]
+
+    # renamed behind this worker's back: only the ledger version tells it
+    fake.table("users").update({"name": "Renamed"}).eq("id", user_id).execute()
+    after = client.get("/balance-sheet")
+    assert after.headers["ETag"] != before.headers["ETag"]
+    assert names(after.json())[user_id] == "Renamed"
+
+
+@pytest.mark.parametrize("path", ["/balance-sheet", "/e/user/{user_id}"])
+def test_naive_and_aware_window_bounds_mix_as_utc(ledger, path):
+    _, tables, client = ledger
+    path = path.format(user_id=tables["users"][0]["id"])
+
+    mixed = client.get(path, params={"since": "2025-01-01", "until": "2025-02-01T00:00:00Z"})
+    aware = client.get(path, params={
+        "since": "2025-01-01T00:00:00Z", "until": "2025-02-01T00:00:00Z"
+    })
+    assert mixed.status_code == aware.status_code == 200
+    assert mixed.json() == aware.json()
+
+    reversed_window = client.get(path, params={
+        "since": "2025-02-01T05:30:00+05:30", "until": "2025-01-01"
+    })
+    assert reversed_window.status_code == 400
+
+
+def test_expense_on_another_worker_keeps_the_name_cache(fresh_ledger):
+    from helpers.utils import user_names
+    fake, tables, client = fresh_ledger
+    user_id, other_id = tables["users"][4]["id"], tables["users"][5]["id"]
+    before = client.get("/balance-sheet")
+    user_names.set("cached-user", "Cached")
+
+    fake.execute_rpc("create_expense_with_splits", {
+        "p_expense": {"name": "Lunch", "description": None, "amount": "10.00",
+                      "created_by": user_id, "split_type": "EXACT", "group_id": None},
+        "p_splits": [{"user_id": user_id, "amount": "5.00"},
+                     {"user_id": other_id, "amount": "5.00"}]
+    })
+    after = client.get("/balance-sheet")
+    assert after.headers["ETag"] != before.headers["ETag"]
+    assert user_names.get("cached-user") == "Cached"
+
+
+@pytest.mark.parametrize("params", [{}, {"as_of": "2025-03-15T00:00:00Z"}])
+def test_user_balance_sheet_names_each_counterparty(ledger, params):
+    _, tables, client = ledger
+    names = {user["id"]: user["name"] for user in tables["users"]}
+    user_id = tables["users"][0]["id"]
+
+    response = client.get(f"/e/user/{user_id}", params=params)
+    assert response.status_code == 200
+    entries = response.json()["detailed_balances"]
+    assert entries
+    for entry in entries:
+        assert entry["user"]["id"] != user_id
+        assert entry["user"]["name"] == names[entry["user"]["id"]]
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_invalid_cursor_is_rejected_with_or_without_stream(ledger, stream):
+    _, _, client = ledger
+    for cursor in ["garbage", "bm90IGpzb24=", "WzFd"]:
+        response = client.get("/e/all", params={"cursor": cursor, "stream": stream})
+        assert response.status_code == 400
+
+
+def test_streamed_expenses_follow_a_valid_cursor(ledger):
+    _, tables, client = ledger
+    page = client.get("/e/all", params={"limit": 100}).json()
+    streamed = client.get("/e/all", params={
+        "limit": 100, "cursor": page["next_cursor"], "stream": True
+    })
+    assert streamed.status_code == 200
+    lines = streamed.text.splitlines()
+    assert len(page["expenses"]) + len(lines) == len(tables["expenses"])
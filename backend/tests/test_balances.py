@@ -0,0 +1,180 @@
+import random
+import uuid
+from collections import defaultdict
+import pytest
+from helpers import vectorized
+from helpers.model import LedgerColumns
+from helpers.money import to_paise
+from helpers.utils import (
+    calculate_balances,
+    calculate_balances_python,
+    calculate_ledger_balances,
+    calculate_user_expense_details
+)
+
+
+# The original O(expenses x splits) implementations, kept verbatim as the
+# reference the balance engine has to match. They work in float rupees.
+
+def reference_calculate_balances(expenses, splits, user_id=None):
+    balances = defaultdict(lambda: defaultdict(float))
+    for expense in expenses:
+        expense_splits = [split for split in splits if split['expense_id'] == expense['id']]
+        payer_id = expense['created_by']
+
+        for split in expense_splits:
+            split_user_id = split['user_id']
+            if user_id is None or split_user_id == user_id or payer_id == user_id:
+                if split_user_id != payer_id:
+                    balances[split_user_id][payer_id] += split['amount']
+
+    return balances
+
+
+def reference_calculate_user_expense_details(expenses, splits, user_id):
+    paid = 0
+    owed = 0
+    balances_by_user = defaultdict(lambda: {"total": 0, "expenses": []})
+
+    for expense in expenses:
+        expense_splits = [s for s in splits if s['expense_id'] == expense['id']]
+
+        if expense['created_by'] == str(user_id):
+            paid += expense['amount']
+            for split in expense_splits:
+                if split['user_id'] != str(user_id):
+                    balances_by_user[split['user_id']]["total"] += split['amount']
+                    balances_by_user[split['user_id']]["expenses"].append({
+                        "expense_name": expense['name'],
+                        "description": expense['description'],
+                        "date": expense['created_at'],
+                        "total_amount": expense['amount'],
+                        "split_amount": split['amount'],
+                        "split_type": expense['split_type']
+                    })
+        else:
+            for split in expense_splits:
+                if split['user_id'] == str(user_id):
+                    owed += split['amount']
+                    balances_by_user[expense['created_by']]["total"] -= split['amount']
+                    balances_by_user[expense['created_by']]["expenses"].append({
+                        "expense_name": expense['name'],
+                        "description": expense['description'],
+                        "date": expense['created_at'],
+                        "total_amount": expense['amount'],
+                        "split_amount": split['amount'],
+                        "split_type": expense['split_type']
+                    })
+
+    return paid, owed, balances_by_user
+
+
+def random_ledger(seed, users=12, expenses=300, max_splits=6):
+    # Rows shaped like the API's, in random order: splits are shuffled, some
+    # include the payer's own share, and some belong to no listed expense
+    rng = random.Random(seed)
+    user_ids = [str(uuid.UUID(int=rng.getrandbits(128))) for _ in range(users)]
+    expense_rows = []
+    split_rows = []
+    for number in range(expenses):
+        expense_id = str(uuid.UUID(int=rng.getrandbits(128)))
+        members = rng.sample(user_ids, rng.randint(1, min(max_splits, users)))
+        amounts = [rng.randint(1, 500000) / 100 for _ in members]
+        expense_rows.append({
+            "id": expense_id,
+            "created_at": f"2025-01-01T00:00:{number % 60:02d}Z",
+            "name": f"Expense {number}",
+            "description": rng.choice([None, "dinner", "rent"]),
+            "amount": round(sum(amounts), 2),
+            "created_by": rng.choice(members + [rng.choice(user_ids)]),
+            "split_type": "EXACT"
+        })
+        split_rows += [
+            {"expense_id": expense_id, "user_id": member, "amount": amount, "percentage": None}
+            for member, amount in zip(members, amounts)
+        ]
+    split_rows += [
+        {"expense_id": str(uuid.UUID(int=rng.getrandbits(128))), "user_id": user_ids[0],
+         "amount": 1.0, "percentage": None}
+    ]
+    rng.shuffle(split_rows)
+    return user_ids, expense_rows, split_rows
+
+
+def in_paise(balances):
+    return {
+        debtor: {creditor: to_paise(amount) for creditor, amount in creditors.items()}
+        for debtor, creditors in balances.items()
+    }
+
+
+def plain(balances):
+    return {debtor: dict(creditors) for debtor, creditors in balances.items()}
+
+
+SEEDS = range(20)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_calculate_balances_matches_reference(seed):
+    user_ids, expenses, splits = random_ledger(seed)
+    for user_id in [None] + user_ids[:3]:
+        expected = in_paise(reference_calculate_balances(expenses, splits, user_id))
+        assert plain(calculate_balances_python(expenses, splits, user_id)) == expected
+        assert plain(calculate_balances(expenses, splits, user_id)) == expected
+        columns = LedgerColumns.from_rows(expenses, splits)
+        assert plain(columns.balances(user_id)) == expected
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_vectorized_balances_match_reference(seed):
+    if not vectorized.is_available():
+        pytest.skip("NumPy is not installed")
+    user_ids, expenses, splits = random_ledger(seed)
+    for user_id in [None] + user_ids[:3]:
+        expected = in_paise(reference_calculate_balances(expenses, splits, user_id))
+        assert plain(vectorized.calculate_balances_vectorized(expenses, splits, user_id)) == expected
+        columns = LedgerColumns.from_rows(expenses, splits)
+        assert plain(vectorized.calculate_ledger_vectorized(columns, user_id)) == expected
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_calculate_user_expense_details_matches_reference(seed):
+    user_ids, expenses, splits = random_ledger(seed)
+    for user_id in user_ids:
+        expected_paid, expected_owed, expected_by_user = \
+            reference_calculate_user_expense_details(expenses, splits, user_id)
+        paid, owed, by_user = calculate_user_expense_details(expenses, splits, user_id)
+
+        assert paid == to_paise(expected_paid)
+        assert owed == to_paise(expected_owed)
+        assert {
+            other: {"total": details["total"], "expenses": details["expenses"]}
+            for other, details in by_user.items()
+        } == {
+            other: {"total": to_paise(details["total"]), "expenses": details["expenses"]}
+            for other, details in expected_by_user.items()
+        }
+
+
+def test_ledger_balances_dispatch_matches_python_path():
+    _, expenses, splits = random_ledger(0, expenses=2000)
+    columns = LedgerColumns.from_rows(expenses, splits)
+    assert plain(calculate_ledger_balances(columns)) == plain(
+        calculate_balances_python(expenses, splits)
+    )
+
+
+def test_vectorized_totals_are_exact_past_float_precision():
+    if not vectorized.is_available():
+        pytest.skip("NumPy is not installed")
+    np = vectorized.np
+    # three splits of one pair; float64 sums 2**53 + 1 + 1 to 2**53
+    balances = vectorized.reduce_balance_columns(
+        ["payer", "debtor"],
+        positions=np.array([0, 0, 0], dtype=np.int64),
+        debtors=np.array([1, 1, 1], dtype=np.int64),
+        amounts=np.array([2 ** 53, 1, 1], dtype=np.int64),
+        payers=np.array([0], dtype=np.int64)
+    )
+    assert plain(balances) == {"debtor": {"payer": 2 ** 53 + 2}}
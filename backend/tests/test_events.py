@@ -0,0 +1,60 @@
+import asyncio
+import json
+import random
+from collections import defaultdict
+import pytest
+from benchmarks.events import pair_totals
+from helpers.events import balance_events
+from helpers.imports import import_expense_stream
+from helpers.ledger import get_ledger_balances
+from helpers.money import to_paise
+
+
+def ndjson(records):
+    async def chunks():
+        for record in records:
+            yield (json.dumps(record) + "\n").encode()
+    return chunks()
+
+
+@pytest.mark.parametrize("fresh_ledger", [
+    {"users": 10, "expenses": 50, "splits_per_expense": 3, "seed": 4}
+], indirect=True)
+def test_imported_expenses_publish_their_balance_changes(fresh_ledger):
+    _, tables, _ = fresh_ledger
+    user_ids = [user["id"] for user in tables["users"]]
+    rng = random.Random(4)
+
+    records = []
+    for number in range(12):
+        members = rng.sample(user_ids, 3)
+        records.append({
+            "name": f"Import {number}", "amount": rng.randint(1, 5000),
+            "created_by": members[0], "split_type": "EQUAL",
+            "splits": [{"user_id": member} for member in members]
+        })
+    # an invalid row is reported and publishes nothing
+    records.insert(5, {"name": "", "amount": 10, "created_by": user_ids[0],
+                       "split_type": "EQUAL", "splits": []})
+
+    async def run():
+        before = pair_totals(await get_ledger_balances())
+        with balance_events.subscribe() as subscription:
+            result = await import_expense_stream(ndjson(records), "ndjson")
+            events = []
+            while not subscription.queue.empty():
+                events.append(subscription.queue.get_nowait())
+        after = pair_totals(await get_ledger_balances())
+        return result, events, before, after
+
+    result, events, before, after = asyncio.run(run())
+    assert result["imported"] == 12 and result["failed"] == 1
+    assert len(events) == 12
+    assert all(event["type"] == "balances_changed" and event["expense_id"] for event in events)
+
+    pushed = defaultdict(lambda: defaultdict(int))
+    for event in events:
+        for change in event["changes"]:
+            pushed[change["from_user"]][change["to_user"]] += to_paise(change["amount"])
+    changed = {pair: after.get(pair, 0) - before.get(pair, 0) for pair in after.keys() | before.keys()}
+    assert pair_totals(pushed) == {pair: paise for pair, paise in changed.items() if paise}
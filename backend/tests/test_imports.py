@@ -0,0 +1,40 @@
+import asyncio
+import json
+import pytest
+from helpers.imports import iter_records, parse_expense
+
+
+def records(text, file_format="csv"):
+    async def chunks():
+        yield text.encode()
+
+    async def collect():
+        return [record async for record in iter_records(chunks(), file_format)]
+    return asyncio.run(collect())
+
+
+SPLITS = json.dumps([{"user_id": "8c7d0f36-9d7e-4b56-8f3a-1d2e3f4a5b6c"}]).replace('"', '""')
+CREATED_BY = "8c7d0f36-9d7e-4b56-8f3a-1d2e3f4a5b6c"
+GROUP_ID = "0f1e2d3c-4b5a-4978-8695-a4b3c2d1e0f9"
+
+
+@pytest.mark.parametrize("header, cell, expected", [
+    ("name,description,amount,created_by,split_type,splits", None, None),
+    ("name,description,amount,created_by,split_type,splits,group_id", "", None),
+    ("name,description,amount,created_by,split_type,splits,group_id", GROUP_ID, GROUP_ID)
+])
+def test_csv_group_id_is_optional_and_blank_means_none(header, cell, expected):
+    row = f'Dinner,,120,{CREATED_BY},EQUAL,"{SPLITS}"'
+    if cell is not None:
+        row += f",{cell}"
+    [(number, record)] = records(f"{header}\n{row}\n")
+    expense, error = parse_expense(record)
+
+    assert number == 1 and error is None
+    assert (str(expense.group_id) if expense.group_id else None) == expected
+    assert expense.description is None
+
+
+def test_csv_without_required_columns_is_refused():
+    with pytest.raises(ValueError, match="missing columns: splits"):
+        records("name,description,amount,created_by,split_type\n")
@@ -0,0 +1,98 @@
+import asyncio
+import pytest
+from helpers.jobs import DONE, PENDING, JobQueue, MemoryJobStore, SQLiteJobStore
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "sqlite":
+        return SQLiteJobStore(str(tmp_path / "jobs.sqlite3"))
+    return MemoryJobStore()
+
+
+async def wait_for_status(queue, job_id, status, timeout=5):
+    async def poll():
+        while (await queue.get(job_id))["status"] != status:
+            await asyncio.sleep(0.01)
+    await asyncio.wait_for(poll(), timeout)
+
+
+def test_finished_jobs_and_results_are_purged(store):
+    async def export(user_id, group_id):
+        return "sheet.pdf", b"%PDF" * 1000
+
+    async def run():
+        queue = JobQueue(store, {"balance_sheet": export}, 1, result_ttl=0.2)
+        await queue.start()
+        job = await queue.submit("balance_sheet", "u1")
+        await wait_for_status(queue, job["id"], DONE)
+        assert await queue.get_result(job["id"]) == b"%PDF" * 1000
+
+        await asyncio.sleep(0.3)
+        await queue.maintain()
+        await queue.stop()
+        return await queue.get(job["id"]), await queue.get_result(job["id"])
+
+    assert asyncio.run(run()) == (None, None)
+
+
+def test_live_owner_keeps_its_jobs_and_dead_owners_jobs_run_once(tmp_path):
+    # Two processes sharing one SQLite store, as uvicorn workers would
+    path = str(tmp_path / "jobs.sqlite3")
+    runs = []
+
+    async def run():
+        release = asyncio.Event()
+
+        async def slow_export(user_id, group_id):
+            runs.append(("first", user_id))
+            await release.wait()
+            return "sheet.pdf", b"first"
+
+        async def export(user_id, group_id):
+            runs.append(("second", user_id))
+            return "sheet.pdf", b"second"
+
+        first = JobQueue(SQLiteJobStore(path), {"balance_sheet": slow_export}, 1,
+                         lease_seconds=0.3)
+        second = JobQueue(SQLiteJobStore(path), {"balance_sheet": export}, 1,
+                          lease_seconds=0.3)
+        await first.start()
+        running = await first.submit("balance_sheet", "running")
+        await wait_for_status(first, running["id"], "running")
+        # queued behind the running job, so still pending
+        queued = await first.submit("balance_sheet", "queued")
+
+        # a restarting worker leaves jobs with a live lease alone
+        await second.start()
+        await asyncio.sleep(0.5)
+        assert (await second.get(running["id"]))["status"] == "running"
+        assert (await second.get(queued["id"]))["status"] == PENDING
+        assert runs == [("first", "running")]
+
+        # once the owner is gone its leases run out and the jobs move over
+        await first.stop()
+        await wait_for_status(second, running["id"], DONE)
+        await wait_for_status(second, queued["id"], DONE)
+        await second.stop()
+        return await second.get_result(running["id"])
+
+    assert asyncio.run(run()) == b"second"
+    assert sorted(runs) == [("first", "running"), ("second", "queued"), ("second", "running")]
+
+
+def test_job_queued_by_two_processes_is_claimed_once(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    first, second = SQLiteJobStore(path), SQLiteJobStore(path)
+    first.create({"id": "job", "kind": "balance_sheet", "user_id": "u1", "group_id": None,
+                  "status": PENDING, "filename": None, "error": None,
+                  "created_at": "2025-01-01T00:00:00+00:00", "finished_at": None},
+                 "first-owner", "2000-01-01T00:00:00+00:00")
+
+    assert second.take_expired("second-owner", "2999-01-01T00:00:00+00:00",
+                               "2025-01-01T00:00:00+00:00") == ["job"]
+    assert first.take_expired("first-owner", "2999-01-01T00:00:00+00:00",
+                              "2025-01-01T00:00:00+00:00") == []
+    assert not first.claim("job", "first-owner")
+    assert second.claim("job", "second-owner")
+    assert not second.claim("job", "second-owner")
@@ -0,0 +1,90 @@
+import random
+from decimal import Decimal
+import pytest
+from schema.expense import ExpenseCreate
+from helpers.money import split_by_percentage, split_equally, to_paise
+from helpers.splits import split_amounts, validate_splits
+
+USERS = [f"00000000-0000-4000-8000-00000000000{number}" for number in range(1, 5)]
+
+
+def percentage_expense(amount, percentages):
+    return ExpenseCreate(
+        name="Rent", amount=amount, created_by=USERS[0], split_type="PERCENTAGE",
+        splits=[{"user_id": user, "percentage": percentage}
+                for user, percentage in zip(USERS, percentages)]
+    )
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_split_equally_adds_up_for_any_total(seed):
+    rng = random.Random(seed)
+    for _ in range(200):
+        total = rng.randint(-10 ** 9, 10 ** 9)
+        parts = rng.randint(1, 30)
+        shares = split_equally(total, parts)
+        assert len(shares) == parts
+        assert sum(shares) == total
+        assert max(shares) - min(shares) <= 1
+
+
+@pytest.mark.parametrize("total, parts, expected", [
+    (100, 3, [34, 33, 33]),
+    (101, 3, [34, 34, 33]),
+    (99, 3, [33, 33, 33]),
+    (-100, 3, [-33, -33, -34]),
+    (2, 5, [1, 1, 0, 0, 0]),
+    (0, 2, [0, 0])
+])
+def test_split_equally_gives_leftover_paise_to_the_first_participants(total, parts, expected):
+    assert split_equally(total, parts) == expected
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_split_by_percentage_adds_up_for_any_total(seed):
+    rng = random.Random(seed)
+    for _ in range(200):
+        total = rng.randint(-10 ** 9, 10 ** 9)
+        percentages = [Decimal(rng.randint(0, 10000)) / 100 for _ in range(rng.randint(1, 8))]
+        if not any(percentages):
+            continue
+        shares = split_by_percentage(total, percentages)
+        assert len(shares) == len(percentages)
+        assert sum(shares) == total
+
+
+@pytest.mark.parametrize("total, percentages, expected", [
+    # leftover paise go to the largest fractional parts
+    (100, ["33.33", "33.33", "33.34"], [33, 33, 34]),
+    (1000, ["33.33", "33.33", "33.34"], [333, 333, 334]),
+    (10000, ["33.33", "33.33", "33.34"], [3333, 3333, 3334]),
+    # ties go to the earlier splits
+    (101, ["50", "50"], [51, 50]),
+    (100, ["33.33", "33.33", "33.33"], [34, 33, 33]),
+    (-101, ["50", "50"], [-50, -51]),
+    (100, ["0", "100"], [0, 100])
+])
+def test_split_by_percentage_rounds_deterministically(total, percentages, expected):
+    assert split_by_percentage(total, percentages) == expected
+
+
+def test_split_by_percentage_refuses_all_zero_percentages():
+    with pytest.raises(ValueError, match="must not all be zero"):
+        split_by_percentage(100, [0, 0, 0])
+    with pytest.raises(ValueError):
+        split_by_percentage(100, ["0.00"])
+
+
+@pytest.mark.parametrize("percentages, valid", [
+    (["33.33", "33.33", "33.34"], True),
+    (["33.33", "33.33", "33.33"], True),
+    (["50", "50.01"], True),
+    (["33.33", "33.33", "33.32"], False),
+    (["50", "50.02"], False)
+])
+def test_percentage_splits_within_a_hundredth_of_100_are_accepted(percentages, valid):
+    expense = percentage_expense("1234.56", percentages)
+    assert (validate_splits(expense) is None) == valid
+    if valid:
+        # even when they do not sum to exactly 100, shares cover the amount
+        assert sum(split_amounts(expense)) == to_paise(expense.amount)
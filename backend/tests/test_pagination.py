@@ -0,0 +1,72 @@
+import asyncio
+from datetime import datetime, timezone
+import pytest
+from helpers import utils
+
+# Reads against a fake whose max_rows cap is far below the rows they return
+# must match the same reads without the cap. The cap stays at the in() chunk
+# size and page limit, which are below the real one.
+
+# with the cap off, so each test sets its own
+UNCAPPED = {"expenses": 2000, "groups": 3, "seed": 2, "max_rows": None}
+
+
+def capped_and_uncapped(fake, read, max_rows=utils.IN_FILTER_CHUNK_SIZE):
+    fake.max_rows = max_rows
+    try:
+        capped = asyncio.run(read())
+    finally:
+        fake.max_rows = None
+    return capped, asyncio.run(read())
+
+
+def by_id(rows):
+    return sorted(rows, key=lambda row: (row['id'], row.get('user_id') or ''))
+
+
+@pytest.mark.parametrize("window", [
+    {},
+    {"group_id": "first"},
+    {"since": datetime(2024, 6, 1, tzinfo=timezone.utc),
+     "until": datetime(2025, 6, 1, tzinfo=timezone.utc)}
+])
+@pytest.mark.parametrize("ledger", [UNCAPPED], indirect=True)
+def test_user_expenses_and_splits_read_past_max_rows(ledger, window):
+    fake, tables, _ = ledger
+    user_id = tables["users"][0]["id"]
+    if window.get("group_id") == "first":
+        window = {"group_id": tables["groups"][0]["id"]}
+
+    (capped_expenses, capped_splits), (expenses, splits) = capped_and_uncapped(
+        fake, lambda: utils.get_user_expenses_and_splits(user_id, **window)
+    )
+    assert len(splits) > utils.IN_FILTER_CHUNK_SIZE
+    assert by_id(capped_expenses) == by_id(expenses)
+    assert by_id(capped_splits) == by_id(splits)
+
+
+@pytest.mark.parametrize("ledger", [UNCAPPED], indirect=True)
+def test_expense_page_splits_read_past_max_rows(ledger):
+    fake, _, _ = ledger
+    (capped_expenses, capped_splits, _), (expenses, splits, _) = capped_and_uncapped(
+        fake, lambda: utils.get_expense_page(utils.IN_FILTER_CHUNK_SIZE)
+    )
+    assert len(splits) > utils.IN_FILTER_CHUNK_SIZE
+    assert capped_expenses == expenses
+    assert by_id(capped_splits) == by_id(splits)
+
+
+@pytest.mark.parametrize("user", [False, True])
+@pytest.mark.parametrize("ledger", [UNCAPPED], indirect=True)
+def test_pair_balances_read_past_max_rows(ledger, user):
+    from helpers.ledger import get_pair_balances
+    fake, tables, _ = ledger
+    user_id = tables["users"][0]["id"] if user else None
+    until = datetime(2025, 6, 1, tzinfo=timezone.utc)
+
+    capped, rows = capped_and_uncapped(
+        fake, lambda: get_pair_balances(until=until, user_id=user_id), max_rows=10
+    )
+    assert len(rows) > 10
+    key = lambda row: (row['debtor_id'], row['creditor_id'])
+    assert sorted(capped, key=key) == sorted(rows, key=key)
@@ -0,0 +1,61 @@
+import random
+from collections import defaultdict
+import pytest
+from helpers.money import to_paise
+from helpers.settlement import net_positions, simplify_debts
+
+
+def random_ledger(users, pairs_per_user, rng):
+    balances = defaultdict(lambda: defaultdict(int))
+    for debtor in range(users):
+        for _ in range(pairs_per_user):
+            creditor = rng.randrange(users)
+            if creditor != debtor:
+                balances[f"u{debtor}"][f"u{creditor}"] += rng.randint(1, 100000)
+    return balances
+
+
+def check_plan(balances, transfers):
+    # every transfer is positive, the plan leaves each user exactly their net
+    # balance, and it needs at most one transfer fewer than the users it moves
+    expected = {user: paise for user, paise in net_positions(balances).items() if paise}
+    settled = defaultdict(int)
+    for debtor, creditor, paise in transfers:
+        assert paise > 0
+        settled[debtor] -= paise
+        settled[creditor] += paise
+    assert {user: paise for user, paise in settled.items() if paise} == expected
+    assert len(transfers) <= max(len(expected) - 1, 0)
+
+
+@pytest.mark.parametrize("seed", range(20))
+@pytest.mark.parametrize("users", [2, 10, 200])
+def test_simplify_debts_settles_random_ledgers(seed, users):
+    balances = random_ledger(users, 5, random.Random(seed))
+    check_plan(balances, simplify_debts(balances))
+
+
+def test_simplify_debts_of_settled_ledger_is_empty():
+    assert simplify_debts({}) == []
+    # a cycle of equal debts nets to zero for everyone
+    assert simplify_debts({"a": {"b": 100}, "b": {"c": 100}, "c": {"a": 100}}) == []
+
+
+@pytest.mark.parametrize("ledger", [{"users": 60, "expenses": 3000, "seed": 1}], indirect=True)
+def test_settle_endpoint_covers_ledger_past_max_rows(ledger):
+    # More ledger pairs than PostgREST returns in one response: the plan must
+    # still settle the balances recomputed from every expense and split
+    from helpers.utils import calculate_balances_python
+
+    fake, tables, client = ledger
+    assert len(fake.tables["user_balances"]) > fake.max_rows
+
+    response = client.get("/balance-sheet/settle")
+    assert response.status_code == 200
+    transfers = [
+        (transfer["from_user"]["id"], transfer["to_user"]["id"], to_paise(transfer["amount"]))
+        for transfer in response.json()
+    ]
+    check_plan(
+        calculate_balances_python(tables["expenses"], tables["expense_splits"]), transfers
+    )
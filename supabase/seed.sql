@@ -21,6 +21,22 @@ create policy "Enable anonymous access"
 -- split types enum
 create type split_type as enum ('EQUAL', 'EXACT', 'PERCENTAGE');
 
+-- Groups table: expenses and balances are partitioned by group
+create table public.groups (
+    id uuid default gen_random_uuid() primary key,
+    created_at timestamp with time zone default timezone('utc'::text, now()) not null,
+    name text not null,
+    created_by uuid references public.users(id) not null
+);
+
+alter table public.groups enable row level security;
+
+create policy "Enable anonymous access to groups"
+    on groups for all
+    to anon
+    using (true)
+    with check (true);
+
 -- Expenses table
 create table public.expenses (
     id uuid default gen_random_uuid() primary key,
@@ -29,7 +45,8 @@ create table public.expenses (
     description text,
     amount decimal(10,2) not null,
     created_by uuid references public.users(id) not null,
-    split_type split_type not null
+    split_type split_type not null,
+    group_id uuid references public.groups(id)  -- null for expenses outside any group
 );
 
 -- Expense splits table
@@ -42,6 +59,12 @@ create table public.expense_splits (
     created_at timestamp with time zone default timezone('utc'::text, now()) not null
 );
 
+-- Indexes for per-user and per-expense lookups
+create index expense_splits_user_id_idx on public.expense_splits (user_id);
+create index expense_splits_expense_id_idx on public.expense_splits (expense_id);
+create index expenses_created_by_idx on public.expenses (created_by);
+create index expenses_group_id_created_at_id_idx on public.expenses (group_id, created_at desc, id desc);
+
 -- Add RLS policies
 alter table public.expenses enable row level security;
 alter table public.expense_splits enable row level security;
@@ -58,4 +81,424 @@ create policy "Enable anonymous access to expense_splits"
     on expense_splits for all
     to anon
     using (true)
-    with check (true);
\ No newline at end of file
+    with check (true);
+
+-- Pairwise balances ledger (debtor owes creditor) per group, maintained per
+-- expense; expenses outside any group are kept under a null group_id
+create table public.user_balances (
+    group_id uuid references public.groups(id),
+    debtor_id uuid references public.users(id) not null,
+    creditor_id uuid references public.users(id) not null,
+    amount decimal(12,2) not null default 0,
+    updated_at timestamp with time zone default timezone('utc'::text, now()) not null,
+    constraint user_balances_pair_key unique nulls not distinct (group_id, debtor_id, creditor_id)
+);
+
+alter table public.user_balances enable row level security;
+
+create policy "Enable anonymous access to user_balances"
+    on user_balances for all
+    to anon
+    using (true)
+    with check (true);
+
+-- Apply the deltas of a single expense to the ledger
+create or replace function public.apply_expense_balances(p_expense_id uuid)
+returns void
+language sql
+as $$
+    insert into public.user_balances (group_id, debtor_id, creditor_id, amount)
+    select e.group_id, s.user_id, e.created_by, sum(s.amount)
+    from public.expense_splits s
+    join public.expenses e on e.id = s.expense_id
+    where s.expense_id = p_expense_id
+      and s.user_id <> e.created_by
+      and s.amount is not null
+    group by e.group_id, s.user_id, e.created_by
+    on conflict (group_id, debtor_id, creditor_id) do update
+        set amount = public.user_balances.amount + excluded.amount,
+            updated_at = timezone('utc'::text, now());
+$$;
+
+-- Recompute the whole ledger from expenses and expense_splits
+create or replace function public.rebuild_user_balances()
+returns void
+language plpgsql
+as $$
+begin
+    delete from public.user_balances where true;
+
+    insert into public.user_balances (group_id, debtor_id, creditor_id, amount)
+    select e.group_id, s.user_id, e.created_by, sum(s.amount)
+    from public.expense_splits s
+    join public.expenses e on e.id = s.expense_id
+    where s.user_id <> e.created_by
+      and s.amount is not null
+    group by e.group_id, s.user_id, e.created_by;
+
+    perform public.bump_all_ledger_versions();
+end;
+$$;
+
+-- Keyset pagination over expenses, newest first
+create index expenses_created_at_id_idx on public.expenses (created_at desc, id desc);
+
+-- Totals for the expenses overview, optionally for a single group
+create or replace function public.expense_overview(p_group_id uuid default null)
+returns table (total_expenses bigint, total_amount numeric, average_amount numeric)
+language plpgsql
+stable
+as $$
+begin
+    -- separate branches so the group case can use the group_id index
+    if p_group_id is null then
+        return query
+        select count(*), coalesce(sum(e.amount), 0), coalesce(round(avg(e.amount), 2), 0)
+        from public.expenses e;
+    else
+        return query
+        select count(*), coalesce(sum(e.amount), 0), coalesce(round(avg(e.amount), 2), 0)
+        from public.expenses e
+        where e.group_id = p_group_id;
+    end if;
+end;
+$$;
+
+-- Create an expense, its splits and its ledger deltas in one transaction
+create or replace function public.create_expense_with_splits(p_expense jsonb, p_splits jsonb)
+returns jsonb
+language plpgsql
+as $$
+declare
+    new_expense public.expenses;
+    split_total decimal;
+    percentage_total decimal;
+begin
+    if jsonb_typeof(p_splits) is distinct from 'array' or jsonb_array_length(p_splits) = 0 then
+        raise exception 'At least one split is required';
+    end if;
+
+    select coalesce(sum((split->>'amount')::decimal), 0),
+           coalesce(sum((split->>'percentage')::decimal), 0)
+    into split_total, percentage_total
+    from jsonb_array_elements(p_splits) as split;
+
+    if split_total <> (p_expense->>'amount')::decimal then
+        raise exception 'Splits add up to % but the expense amount is %',
+            split_total, p_expense->>'amount';
+    end if;
+
+    if p_expense->>'split_type' = 'PERCENTAGE' and abs(percentage_total - 100) > 0.01 then
+        raise exception 'Percentage splits must sum to 100%%';
+    end if;
+
+    insert into public.expenses (name, description, amount, created_by, split_type, group_id)
+    values (
+        p_expense->>'name',
+        p_expense->>'description',
+        (p_expense->>'amount')::decimal,
+        (p_expense->>'created_by')::uuid,
+        (p_expense->>'split_type')::split_type,
+        (p_expense->>'group_id')::uuid
+    )
+    returning * into new_expense;
+
+    insert into public.expense_splits (expense_id, user_id, amount, percentage)
+    select new_expense.id,
+           (split->>'user_id')::uuid,
+           (split->>'amount')::decimal,
+           (split->>'percentage')::decimal
+    from jsonb_array_elements(p_splits) as split;
+
+    perform public.apply_expense_balances(new_expense.id);
+    perform public.bump_ledger_version(new_expense.group_id);
+
+    return to_jsonb(new_expense) || jsonb_build_object(
+        'splits',
+        (select jsonb_agg(to_jsonb(s)) from public.expense_splits s where s.expense_id = new_expense.id)
+    );
+end;
+$$;
+
+-- Bulk import: each row is {"row", "expense", "splits"}; rows that fail are
+-- rolled back on their own and reported instead of aborting the batch
+create or replace function public.import_expenses(p_rows jsonb)
+returns table (row_index integer, created_expense_id uuid, error_message text)
+language plpgsql
+as $$
+declare
+    item jsonb;
+    new_expense_id uuid;
+begin
+    for item in select value from jsonb_array_elements(p_rows)
+    loop
+        row_index := (item->>'row')::integer;
+        begin
+            new_expense_id := (
+                public.create_expense_with_splits(item->'expense', item->'splits')->>'id'
+            )::uuid;
+
+            created_expense_id := new_expense_id;
+            error_message := null;
+        exception when others then
+            created_expense_id := null;
+            error_message := sqlerrm;
+        end;
+        return next;
+    end loop;
+end;
+$$;
+
+-- Bulk user creation: one transaction per call, with each row inserted on
+-- its own so a duplicate email or mobile only fails that row
+create or replace function public.import_users(p_rows jsonb)
+returns table (row_index integer, created_user_id uuid, error_message text)
+language plpgsql
+as $$
+declare
+    item jsonb;
+    conflict text;
+begin
+    for item in select value from jsonb_array_elements(p_rows)
+    loop
+        row_index := (item->>'row')::integer;
+        begin
+            insert into public.users (email, name, mobile)
+            values (
+                item->'user'->>'email',
+                item->'user'->>'name',
+                item->'user'->>'mobile'
+            )
+            returning id into created_user_id;
+            error_message := null;
+        exception
+            when unique_violation then
+                get stacked diagnostics conflict = constraint_name;
+                created_user_id := null;
+                error_message := case conflict
+                    when 'users_email_key' then 'email already exists'
+                    when 'users_mobile_key' then 'mobile already exists'
+                    else sqlerrm
+                end;
+            when others then
+                created_user_id := null;
+                error_message := sqlerrm;
+        end;
+        return next;
+    end loop;
+end;
+$$;
+
+-- Version counters behind the ETags of the balance and listing endpoints:
+-- one row per group plus the null-group row that covers every expense
+create table public.ledger_versions (
+    group_id uuid references public.groups(id),
+    version bigint not null default 0,
+    -- bumped by user renames only, on the overall (null group) row, so
+    -- workers can tell when their cached names are stale
+    names_version bigint not null default 0,
+    updated_at timestamp with time zone default timezone('utc'::text, now()) not null,
+    constraint ledger_versions_group_key unique nulls not distinct (group_id)
+);
+
+alter table public.ledger_versions enable row level security;
+
+create policy "Enable anonymous access to ledger_versions"
+    on ledger_versions for all
+    to anon
+    using (true)
+    with check (true);
+
+-- Bump the overall version and, for grouped expenses, the group's version
+create or replace function public.bump_ledger_version(p_group_id uuid)
+returns void
+language sql
+as $$
+    insert into public.ledger_versions as v (group_id, version)
+    select scope, 1
+    from (values (null::uuid), (p_group_id)) as scopes(scope)
+    group by scope
+    on conflict (group_id) do update
+        set version = v.version + 1,
+            updated_at = timezone('utc'::text, now());
+$$;
+
+-- Bump every version, e.g. after a rebuild or when user names change
+create or replace function public.bump_all_ledger_versions()
+returns void
+language sql
+as $$
+    insert into public.ledger_versions as v (group_id, version)
+    select null::uuid, 1
+    union all
+    select g.id, 1 from public.groups g
+    on conflict (group_id) do update
+        set version = v.version + 1,
+            updated_at = timezone('utc'::text, now());
+$$;
+
+create or replace function public.bump_ledger_versions_on_rename()
+returns trigger
+language plpgsql
+as $$
+begin
+    perform public.bump_all_ledger_versions();
+    update public.ledger_versions
+        set names_version = names_version + 1
+        where group_id is null;
+    return null;
+end;
+$$;
+
+-- user names are part of every balance and listing payload
+create trigger users_name_changed
+    after update of name on public.users
+    for each statement
+    execute function public.bump_ledger_versions_on_rename();
+
+-- Current version of one group, or of all expenses when p_group_id is null,
+-- with the names version every scope shares
+create or replace function public.ledger_version(p_group_id uuid default null)
+returns table (version bigint, updated_at timestamp with time zone, names_version bigint)
+language sql
+stable
+as $$
+    select coalesce(max(v.version), 0), max(v.updated_at),
+        (select coalesce(max(n.names_version), 0)
+         from public.ledger_versions n
+         where n.group_id is null)
+    from public.ledger_versions v
+    where v.group_id is not distinct from p_group_id;
+$$;
+
+-- Cumulative pair balances at the start of each month, so balances as of a
+-- date only replay the expenses after the nearest snapshot. Rows where the
+-- debtor is also the creditor hold the payer's own share of their expenses.
+create table public.balance_snapshots (
+    period_end timestamp with time zone not null,
+    group_id uuid references public.groups(id),
+    debtor_id uuid references public.users(id) not null,
+    creditor_id uuid references public.users(id) not null,
+    amount decimal(14,2) not null,
+    constraint balance_snapshots_pair_key
+        unique nulls not distinct (period_end, group_id, debtor_id, creditor_id)
+);
+
+alter table public.balance_snapshots enable row level security;
+
+create policy "Enable anonymous access to balance_snapshots"
+    on balance_snapshots for all
+    to anon
+    using (true)
+    with check (true);
+
+-- Snapshot balances for expenses created before p_period_end, starting from
+-- the previous snapshot rather than the whole history
+create or replace function public.snapshot_balances(p_period_end timestamp with time zone)
+returns void
+language plpgsql
+as $$
+declare
+    previous_end timestamp with time zone;
+begin
+    select max(b.period_end) into previous_end
+    from public.balance_snapshots b
+    where b.period_end < p_period_end;
+
+    delete from public.balance_snapshots where period_end = p_period_end;
+
+    insert into public.balance_snapshots (period_end, group_id, debtor_id, creditor_id, amount)
+    select p_period_end, d.group_id, d.debtor_id, d.creditor_id, sum(d.amount)
+    from (
+        select b.group_id, b.debtor_id, b.creditor_id, b.amount
+        from public.balance_snapshots b
+        where b.period_end = previous_end
+        union all
+        select e.group_id, s.user_id, e.created_by, s.amount
+        from public.expenses e
+        join public.expense_splits s on s.expense_id = e.id
+        where e.created_at >= coalesce(previous_end, '-infinity'::timestamp with time zone)
+          and e.created_at < p_period_end
+          and s.amount is not null
+    ) d
+    group by d.group_id, d.debtor_id, d.creditor_id;
+end;
+$$;
+
+-- Snapshot every month boundary that has passed since the latest snapshot
+-- (or the first expense); run it periodically, e.g. daily with pg_cron
+create or replace function public.snapshot_due_balances()
+returns integer
+language plpgsql
+as $$
+declare
+    next_end timestamp with time zone;
+    created integer := 0;
+begin
+    select max(period_end) + interval '1 month' into next_end
+    from public.balance_snapshots;
+
+    if next_end is null then
+        select date_trunc('month', min(created_at)) + interval '1 month' into next_end
+        from public.expenses;
+    end if;
+
+    while next_end is not null and next_end <= now() loop
+        perform public.snapshot_balances(next_end);
+        created := created + 1;
+        next_end := next_end + interval '1 month';
+    end loop;
+
+    return created;
+end;
+$$;
+
+-- Pair balances, including payers' own shares, from the expenses created in
+-- [p_since, p_until). Without p_since they are cumulative: the nearest
+-- snapshot at or before p_until plus only the expenses after it.
+create or replace function public.pair_balances(
+    p_since timestamp with time zone default null,
+    p_until timestamp with time zone default null,
+    p_group_id uuid default null,
+    p_user_id uuid default null
+)
+returns table (debtor_id uuid, creditor_id uuid, amount numeric)
+language plpgsql
+stable
+as $$
+declare
+    base timestamp with time zone;
+begin
+    if p_since is null then
+        select max(b.period_end) into base
+        from public.balance_snapshots b
+        where p_until is null or b.period_end <= p_until;
+    end if;
+
+    return query
+    select d.debtor_id, d.creditor_id, sum(d.amount)
+    from (
+        select b.debtor_id, b.creditor_id, b.amount
+        from public.balance_snapshots b
+        where b.period_end = base
+          and (p_group_id is null or b.group_id = p_group_id)
+          and (p_user_id is null or p_user_id in (b.debtor_id, b.creditor_id))
+        union all
+        select s.user_id, e.created_by, s.amount
+        from public.expenses e
+        join public.expense_splits s on s.expense_id = e.id
+        where e.created_at >= coalesce(p_since, base, '-infinity'::timestamp with time zone)
+          and (p_until is null or e.created_at < p_until)
+          and (p_group_id is null or e.group_id = p_group_id)
+          and (p_user_id is null or p_user_id in (s.user_id, e.created_by))
+          and s.amount is not null
+    ) d
+    group by d.debtor_id, d.creditor_id;
+end;
+$$;
+
+-- Populate the ledger for existing data
+select public.rebuild_user_balances();
+
+-- Snapshot the months that have already passed
+select public.snapshot_due_balances();